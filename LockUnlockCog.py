@@ -1,11 +1,44 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction
+from discord.utils import utcnow
+from datetime import timedelta
+
+from .bulk_executor import run_bulk
+from .guild_settings import settings
+from .log_dispatcher import log_dispatcher
+from .moderation import parse_duration
+from .scheduler import scheduler
+from .storage import db
+
+# Channel edits in flight during /lockdown. Each channel is its own rate-limit
+# bucket, so this mostly guards the global limit.
+LOCKDOWN_CONCURRENCY = 10
 
 class LockUnlock(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.bot.loop.create_task(self.start_jobs())
+
+    async def start_jobs(self):
+        await self.bot.wait_until_ready()
+        scheduler.register("lock_end", self.on_lock_end)
+        await scheduler.start()
+
+    def cog_unload(self):
+        scheduler.unregister("lock_end")
+
+    async def on_lock_end(self, key, payload):
+        channel = self.bot.get_channel(int(key))
+        if not channel:
+            return
+        overwrite = channel.overwrites_for(channel.guild.default_role)
+        overwrite.send_messages = None
+        await channel.set_permissions(channel.guild.default_role, overwrite=overwrite, reason="Timed lock expired")
+        await channel.send("🔓 This channel has been unlocked automatically.")
+
     async def _get_staff_role(self, guild: discord.Guild) -> discord.Role:
         for role in guild.roles:
             if role.name.lower() == "staff team":
@@ -13,7 +46,18 @@ class LockUnlock(commands.Cog):
         return None
 
     @app_commands.command(name="lock", description="Lock the current channel for non-staff.")
-    async def lock(self, interaction: Interaction):
+    @app_commands.describe(duration="(Optional) Unlock automatically after this long, e.g. 30m")
+    async def lock(self, interaction: Interaction, duration: str = None):
+        if duration is not None:
+            try:
+                duration = parse_duration(duration)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+            if duration <= timedelta(0):
+                await interaction.response.send_message("❌ The duration must be longer than zero.", ephemeral=True)
+                return
+
         await interaction.response.defer(ephemeral=True)
         channel = interaction.channel
         guild = interaction.guild
@@ -27,8 +71,14 @@ class LockUnlock(commands.Cog):
         overwrite.send_messages = False
         await channel.set_permissions(guild.default_role, overwrite=overwrite)
 
-        await interaction.followup.send(f"🔒 Locked {channel.mention} for everyone except **{staff_role.name}**.")
-        await channel.send("🔒 This channel has been locked by staff.")
+        if duration is not None:
+            await scheduler.schedule("lock_end", channel.id, utcnow() + duration)
+        elif scheduler.has("lock_end", channel.id):
+            await scheduler.cancel("lock_end", channel.id)
+
+        length = f" for {duration}" if duration is not None else ""
+        await interaction.followup.send(f"🔒 Locked {channel.mention}{length} for everyone except **{staff_role.name}**.")
+        await channel.send(f"🔒 This channel has been locked by staff{length}.")
 
     @app_commands.command(name="unlock", description="Unlock the current channel for everyone.")
     async def unlock(self, interaction: Interaction):
@@ -39,10 +89,101 @@ class LockUnlock(commands.Cog):
         overwrite = channel.overwrites_for(guild.default_role)
         overwrite.send_messages = None
         await channel.set_permissions(guild.default_role, overwrite=overwrite)
+        if scheduler.has("lock_end", channel.id):
+            await scheduler.cancel("lock_end", channel.id)
 
         await interaction.followup.send(f"🔓 Unlocked {channel.mention}.")
         await channel.send("🔓 This channel has been unlocked by staff.")
 
+    # ─── Server-wide lockdown ──────────────────────────────────────────────────
+    #
+    # start snapshots every text channel's @everyone overwrite before touching
+    # anything, then denies send_messages everywhere. end puts back each exact
+    # snapshot and forgets it. Both are resumable: after a partial failure,
+    # running the same command again only redoes what is left.
+
+    lockdown = app_commands.Group(name="lockdown", description="Lock or unlock every text channel at once.")
+
+    @lockdown.command(name="start", description="Lock every text channel for @everyone.")
+    @app_commands.checks.has_permissions(manage_channels=True)
+    async def lockdown_start(self, interaction: Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild
+        everyone = guild.default_role
+
+        snapshots = []
+        for channel in guild.text_channels:
+            allow, deny = channel.overwrites_for(everyone).pair()
+            snapshots.append((channel.id, allow.value, deny.value, everyone in channel.overwrites))
+        await db.save_lockdown_snapshots(guild.id, snapshots)
+
+        async def lock_one(channel):
+            overwrite = channel.overwrites_for(everyone)
+            if overwrite.send_messages is False:
+                return False
+            overwrite.send_messages = False
+            await channel.set_permissions(everyone, overwrite=overwrite, reason=f"Lockdown by {interaction.user}")
+
+        async def progress(result):
+            await interaction.edit_original_response(content=f"🔒 Locking… {result.finished}/{result.total}")
+
+        result = await run_bulk(guild.text_channels, lock_one, progress, LOCKDOWN_CONCURRENCY)
+
+        summary = f"🔒 Lockdown active: locked **{len(result.done)}** channel(s)."
+        if result.skipped:
+            summary += f"\n• {len(result.skipped)} were already locked."
+        if result.failed:
+            summary += (
+                f"\n• {len(result.failed)} failed: " + ", ".join(c.mention for c in result.failed[:20])
+                + "\nRun `/lockdown start` again to retry them."
+            )
+        await interaction.edit_original_response(content=summary)
+        self.log_lockdown(interaction, "🔒 Server Lockdown Started", result)
+
+    @lockdown.command(name="end", description="Restore every channel to how it was before the lockdown.")
+    @app_commands.checks.has_permissions(manage_channels=True)
+    async def lockdown_end(self, interaction: Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild
+        everyone = guild.default_role
+
+        snapshots = await db.load_lockdown_snapshots(guild.id)
+        if not snapshots:
+            await interaction.edit_original_response(content="There is no lockdown to end.")
+            return
+
+        async def restore_one(channel_id):
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                return False
+            allow, deny, had_overwrite = snapshots[channel_id]
+            overwrite = None
+            if had_overwrite:
+                overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+            await channel.set_permissions(everyone, overwrite=overwrite, reason=f"Lockdown ended by {interaction.user}")
+
+        async def progress(result):
+            await interaction.edit_original_response(content=f"🔓 Restoring… {result.finished}/{result.total}")
+
+        result = await run_bulk(list(snapshots), restore_one, progress, LOCKDOWN_CONCURRENCY)
+        # Deleted channels (skipped) are done with as well; failures keep their snapshot.
+        await db.delete_lockdown_snapshots(guild.id, result.done + result.skipped)
+
+        summary = f"🔓 Lockdown ended: restored **{len(result.done)}** channel(s)."
+        if result.failed:
+            summary += (
+                f"\n• {len(result.failed)} failed: " + ", ".join(f"<#{c}>" for c in result.failed[:20])
+                + "\nRun `/lockdown end` again to retry them."
+            )
+        await interaction.edit_original_response(content=summary)
+        self.log_lockdown(interaction, "🔓 Server Lockdown Ended", result)
+
+    def log_lockdown(self, interaction, title, result):
+        embed = discord.Embed(title=title, color=discord.Color.red(), timestamp=utcnow())
+        embed.add_field(name="Moderator", value=interaction.user.mention, inline=False)
+        embed.add_field(name="Channels", value=f"{len(result.done)} changed, {len(result.failed)} failed", inline=False)
+        log_dispatcher.post(settings.get_channel(interaction.guild, "modlog_channel"), embed)
+
 # Cog setup function
 async def setup(bot):
     await bot.add_cog(LockUnlock(bot))  # This is the correct way, no need to await
\ No newline at end of file
@@ -1,80 +1,89 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 from datetime import datetime, timedelta, timezone
+from typing import Literal
 
-class AutoJoinRole(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.invites = {}
+from .counters import counters
+from .guild_settings import settings
+from .invite_cache import InviteCache
+from .invite_index import invite_index
+from .join_pipeline import JoinPipeline
+from .storage import DAILY, HOURLY, db
 
-    def get_settings_path(self, guild_id):
-        os.makedirs("server_data", exist_ok=True)
-        return f"server_data/{guild_id}_settings.json"
+LEADERBOARD_PAGE_SIZE = 10
+JOINSTATS_ROWS = 20
 
-    def get_invite_data_path(self, guild_id):
-        os.makedirs("server_data", exist_ok=True)
-        return f"server_data/{guild_id}_invites.json"
+class LeaderboardView(discord.ui.View):
+    def __init__(self, guild: discord.Guild, user: discord.User):
+        super().__init__(timeout=120)
+        self.guild = guild
+        self.user = user
+        self.page = 0
 
-    def get_members_data_path(self, guild_id):
-        os.makedirs("server_data", exist_ok=True)
-        return f"server_data/{guild_id}_members.json"
+    def page_count(self):
+        return max(1, -(-invite_index.count(self.guild.id) // LEADERBOARD_PAGE_SIZE))
 
-    def save_setting(self, guild_id, key, value):
-        path = self.get_settings_path(guild_id)
-        data = {}
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    data = {}
-        data[key] = value
-        with open(path, "w") as f:
-            json.dump(data, f, indent=4)
+    def build_embed(self):
+        self.page = min(self.page, self.page_count() - 1)
+        offset = self.page * LEADERBOARD_PAGE_SIZE
 
-    def load_setting(self, guild_id, key):
-        path = self.get_settings_path(guild_id)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                try:
-                    data = json.load(f)
-                    return data.get(key)
-                except json.JSONDecodeError:
-                    return None
-        return None
-
-    def load_invite_counts(self, guild_id):
-        path = self.get_invite_data_path(guild_id)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    return {}
-        return {}
-
-    def save_invite_counts(self, guild_id, data):
-        path = self.get_invite_data_path(guild_id)
-        with open(path, "w") as f:
-            json.dump(data, f, indent=4)
-
-    def load_members_data(self, guild_id):
-        path = self.get_members_data_path(guild_id)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    return {}
-        return {}
+        description = ""
+        entries = invite_index.top(self.guild.id, offset, LEADERBOARD_PAGE_SIZE)
+        for i, (user_id, stats) in enumerate(entries, start=offset + 1):
+            member = self.guild.get_member(user_id)
+            name = member.mention if member else f"<@{user_id}>"
+            net = stats["joined"] - stats["left"] - stats["fake"]
+            description += (
+                f"**{i}.** {name} → **{net}** "
+                f"(joined: {stats['joined']}, left: {stats['left']}, fake: {stats['fake']})\n"
+            )
+
+        if not description:
+            description = "No invite data found."
+
+        embed = discord.Embed(
+            title="🏆 Invite Leaderboard",
+            description=description,
+            color=discord.Color.gold()
+        )
+        rank = invite_index.rank(self.guild.id, self.user.id)
+        footer = f"Page {self.page + 1}/{self.page_count()}"
+        if rank:
+            footer += f" • Your rank: #{rank}"
+        embed.set_footer(text=footer)
+
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count() - 1
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("Run /invite_leaderboard to browse it yourself.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
 
-    def save_members_data(self, guild_id, data):
-        path = self.get_members_data_path(guild_id)
-        with open(path, "w") as f:
-            json.dump(data, f, indent=4)
+class AutoJoinRole(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.invites = InviteCache()
+        self.pipeline = JoinPipeline()
+
+    async def save_setting(self, guild_id, key, value):
+        await settings.update(guild_id, key, value)
+
+    def load_setting(self, guild_id, key):
+        return settings.get(guild_id, key)
 
     @app_commands.command(name="join_role", description="Set a role to automatically give when someone joins")
     @app_commands.checks.has_permissions(manage_roles=True)
@@ -83,16 +92,17 @@ class AutoJoinRole(commands.Cog):
             await interaction.response.send_message("That role is higher than my top role. Please choose a lower role.", ephemeral=True)
             return
 
-        self.save_setting(interaction.guild.id, "join_role", role.id)
+        await self.save_setting(interaction.guild.id, "join_role", role.id)
         await interaction.response.send_message(f"✅ Members who join will now receive the **{role.name}** role.", ephemeral=True)
 
     @app_commands.command(name="invites", description="Check how many people a user has invited")
     async def invites(self, interaction: discord.Interaction, user: discord.User = None):
         user = user or interaction.user
-        invite_data = self.load_invite_counts(interaction.guild.id)
-        joined = invite_data.get(str(user.id), {}).get("joined", 0)
-        left = invite_data.get(str(user.id), {}).get("left", 0)
-        fake = invite_data.get(str(user.id), {}).get("fake", 0)
+        await invite_index.load(interaction.guild.id)
+        stats = invite_index.stats(interaction.guild.id, user.id)
+        joined = stats["joined"]
+        left = stats["left"]
+        fake = stats["fake"]
         net_invites = joined - left - fake
 
         embed = discord.Embed(
@@ -111,32 +121,57 @@ class AutoJoinRole(commands.Cog):
 
     @app_commands.command(name="invite_leaderboard", description="See the top inviters in the server.")
     async def invite_leaderboard(self, interaction: discord.Interaction):
-        invite_data = self.load_invite_counts(interaction.guild.id)
-        leaderboard = []
-
-        for user_id, stats in invite_data.items():
-            joined = stats.get("joined", 0)
-            left = stats.get("left", 0)
-            net = joined - left
-            leaderboard.append((user_id, joined, left, net))
-
-        leaderboard.sort(key=lambda x: x[3], reverse=True)
-        top_entries = leaderboard[:10]
-
-        description = ""
-        for i, (user_id, joined, left, net) in enumerate(top_entries, start=1):
-            user = interaction.guild.get_member(int(user_id))
-            name = user.mention if user else f"<@{user_id}>"
-            description += f"**{i}.** {name} → **{net}** (joined: {joined}, left: {left})\n"
-
-        if not description:
-            description = "No invite data found."
+        await invite_index.load(interaction.guild.id)
+        view = LeaderboardView(interaction.guild, interaction.user)
+        await interaction.response.send_message(embed=view.build_embed(), view=view)
+
+    @app_commands.command(name="joinstats", description="Show joins, leaves and fake joins over time.")
+    @app_commands.describe(
+        days="How many days to look back (default 7)",
+        granularity="Break the numbers down per day or per hour",
+        user="(Optional) Only count members invited by this user"
+    )
+    async def joinstats(
+        self,
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 1, 90] = 7,
+        granularity: Literal["daily", "hourly"] = "daily",
+        user: discord.User = None
+    ):
+        period = HOURLY if granularity == "hourly" else DAILY
+        since = datetime.now(timezone.utc).timestamp() - days * DAILY
+        rows = await db.member_event_rollups(interaction.guild.id, period, since, user.id if user else 0)
+
+        joined = sum(row[1] for row in rows)
+        left = sum(row[2] for row in rows)
+        fake = sum(row[3] for row in rows)
 
         embed = discord.Embed(
-            title="🏆 Invite Leaderboard",
-            description=description,
-            color=discord.Color.gold()
+            title=f"📈 Join Stats — last {days} day(s)",
+            description=f"Members invited by {user.mention}" if user else None,
+            color=discord.Color.red()
         )
+        embed.add_field(name="Joined", value=str(joined))
+        embed.add_field(name="Left", value=str(left))
+        embed.add_field(name="Fake", value=str(fake))
+        embed.add_field(name="Net", value=str(joined - left - fake))
+
+        if rows:
+            style = "f" if period == HOURLY else "D"
+            peak = max(rows, key=lambda row: row[1] + row[3])
+            embed.add_field(
+                name=f"Busiest {'hour' if period == HOURLY else 'day'}",
+                value=f"<t:{peak[0]}:{style}> — {peak[1] + peak[3]} join(s)",
+                inline=False
+            )
+            lines = [
+                f"<t:{bucket}:{style}> — +{j} / -{l}" + (f" / {f} fake" if f else "")
+                for bucket, j, l, f in rows[-JOINSTATS_ROWS:]
+            ]
+            embed.add_field(name="Most recent", value="\n".join(reversed(lines)), inline=False)
+        else:
+            embed.add_field(name="Most recent", value="No joins or leaves recorded in this period.", inline=False)
+
         await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="invitesreset", description="Reset invite counts. Leave empty to reset all, or mention a user to reset one.")
@@ -144,48 +179,31 @@ class AutoJoinRole(commands.Cog):
     @app_commands.checks.has_permissions(manage_guild=True)
     async def invitesreset(self, interaction: discord.Interaction, user: discord.User = None):
         guild_id = interaction.guild.id
-        invite_data = self.load_invite_counts(guild_id)
-        claims_path = f"invites_{guild_id}.json"
 
         if user is None:
-            for uid in invite_data:
-                invite_data[uid] = {"joined": 0, "left": 0, "fake": 0}
-            self.save_invite_counts(guild_id, invite_data)
-
-            if os.path.exists(claims_path):
-                with open(claims_path, "w") as f:
-                    json.dump({}, f, indent=4)
+            await counters.reset_invites(guild_id)
 
             await interaction.response.send_message("✅ All invite stats and claims have been reset.", ephemeral=True)
         else:
-            uid = str(user.id)
-            if uid in invite_data:
-                invite_data[uid] = {"joined": 0, "left": 0, "fake": 0}
-                self.save_invite_counts(guild_id, invite_data)
-
-            if os.path.exists(claims_path):
-                try:
-                    with open(claims_path, "r") as f:
-                        claims = json.load(f)
-                    if uid in claims:
-                        del claims[uid]
-                        with open(claims_path, "w") as f:
-                            json.dump(claims, f, indent=4)
-                except json.JSONDecodeError:
-                    pass
+            await counters.reset_invites(guild_id, user.id)
 
             await interaction.response.send_message(f"✅ Invite stats and claims reset for {user.mention}.", ephemeral=True)
 
     async def update_invites(self, guild: discord.Guild):
-        try:
-            self.invites[guild.id] = await guild.invites()
-        except discord.Forbidden:
-            self.invites[guild.id] = []
+        await self.invites.refresh(guild)
+
+    async def cog_load(self):
+        # Last known snapshots, so joins right after a restart can be attributed
+        # before the warm-up below has refreshed their guild.
+        await self.invites.restore()
+
+    async def cog_unload(self):
+        await counters.flush()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        for guild in self.bot.guilds:
-            await self.update_invites(guild)
+        await settings.preload([guild.id for guild in self.bot.guilds])
+        await self.invites.warm_up(self.bot.guilds)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
@@ -193,66 +211,50 @@ class AutoJoinRole(commands.Cog):
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
-        await self.update_invites(invite.guild)
+        self.invites.add_invite(invite)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite):
-        await self.update_invites(invite.guild)
+        self.invites.remove_invite(invite)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         guild = member.guild
-        inviter = "Unknown"
-        inviter_id = None
-
-        try:
-            before = self.invites.get(guild.id, [])
-            after = await guild.invites()
-            for old in before:
-                for new in after:
-                    if old.code == new.code and new.uses > old.uses:
-                        inviter = new.inviter.mention
-                        inviter_id = new.inviter.id
-                        break
-        except Exception as e:
-            print(f"Error checking invites: {e}")
-
-        await self.update_invites(guild)
-
-        members_data = self.load_members_data(guild.id)
-        invite_data = self.load_invite_counts(guild.id)
+        inviter_id = await self.invites.attribute(guild)
+        inviter = f"<@{inviter_id}>" if inviter_id else "Unknown"
 
         now = datetime.now(timezone.utc)
         account_age = now - member.created_at
         is_fake = account_age < timedelta(days=7)  # Account younger than 3 days = fake invite
 
-        if inviter_id and str(member.id) not in members_data:
-            if str(inviter_id) not in invite_data:
-                invite_data[str(inviter_id)] = {"joined": 0, "left": 0, "fake": 0}
+        # Joins with an unknown inviter are recorded too, for /joinstats.
+        await counters.record_join(guild.id, member.id, inviter_id, is_fake)
 
-            if is_fake:
-                invite_data[str(inviter_id)]["fake"] = invite_data[str(inviter_id)].get("fake", 0) + 1
-            else:
-                invite_data[str(inviter_id)]["joined"] += 1
-
-            members_data[str(member.id)] = {"inviter_id": inviter_id, "fake": is_fake}
-            self.save_invite_counts(guild.id, invite_data)
+        batched = self.pipeline.record_join(guild)
 
         role_id = self.load_setting(guild.id, "join_role")
         role = guild.get_role(role_id) if role_id else None
         if role:
-            try:
-                await member.add_roles(role, reason="Auto-assigned join role")
-            except discord.Forbidden:
-                print(f"Missing permissions to assign role {role.name} in {guild.name}")
-            members_data[str(member.id)]["role"] = role.name
-
-        self.save_members_data(guild.id, members_data)
+            if batched:
+                self.pipeline.queue_role(member, role)
+            else:
+                try:
+                    await member.add_roles(role, reason="Auto-assigned join role")
+                    await db.set_member_role(guild.id, member.id, role.name)
+                except discord.Forbidden:
+                    print(f"Missing permissions to assign role {role.name} in {guild.name}")
+                except discord.HTTPException as e:
+                    print(f"Failed to assign join role to {member}: {e}")
 
         channel_id = self.load_setting(guild.id, "welcome_channel")
         if channel_id:
             channel = guild.get_channel(channel_id)
-            if channel:
+            if channel and batched:
+                line = f"{member.mention} — invited by {inviter}"
+                if is_fake:
+                    line += " ⚠️ new account"
+                self.pipeline.queue_welcome(channel, line)
+            elif channel:
                 description = f"Welcome to **{guild.name}**, {member.mention}!\nInvited by: {inviter}"
                 if is_fake:
                     description += "\n⚠️ Account is new (< 3 days old) — counted as a fake invite."
@@ -271,18 +273,7 @@ class AutoJoinRole(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         guild = member.guild
-        members_data = self.load_members_data(guild.id)
-        invite_data = self.load_invite_counts(guild.id)
-
-        member_info = members_data.pop(str(member.id), None)
-        if member_info and "inviter_id" in member_info:
-            inviter_id = member_info["inviter_id"]
-            if str(inviter_id) not in invite_data:
-                invite_data[str(inviter_id)] = {"joined": 0, "left": 0, "fake": 0}
-            invite_data[str(inviter_id)]["left"] += 1
-            self.save_invite_counts(guild.id, invite_data)
-
-        self.save_members_data(guild.id, members_data)
+        await counters.record_leave(guild.id, member.id)
 
 async def setup(bot):
     await bot.add_cog(AutoJoinRole(bot))
@@ -0,0 +1,78 @@
+import asyncio
+
+import discord
+
+# Requests in flight at once. discord.py already waits out 429s per route; this
+# keeps a bulk run from tripping them (and the global limit) in the first place.
+BULK_CONCURRENCY = 5
+
+# Minimum seconds between two progress callbacks.
+PROGRESS_INTERVAL = 2.0
+
+# Extra attempts for a request that failed with a Discord server error.
+SERVER_ERROR_RETRIES = 2
+
+# ─── Bulk Action Executor ──────────────────────────────────────────────────────
+#
+# Runs one coroutine per target with bounded concurrency and sorts the targets
+# into done / skipped / failed. The action returns False to skip a target (e.g.
+# a NotFound that means "nothing to do"); any exception it raises marks it as
+# failed. Progress is reported from a single ticker, so a caller editing one
+# message never sends more than one edit per PROGRESS_INTERVAL.
+
+class BulkResult:
+    def __init__(self, total):
+        self.total = total
+        self.done = []
+        self.skipped = []
+        self.failed = []
+
+    @property
+    def finished(self):
+        return len(self.done) + len(self.skipped) + len(self.failed)
+
+
+async def run_bulk(targets, action, progress=None, concurrency=BULK_CONCURRENCY):
+    result = BulkResult(len(targets))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(target):
+        async with semaphore:
+            for attempt in range(SERVER_ERROR_RETRIES + 1):
+                try:
+                    if await action(target) is False:
+                        result.skipped.append(target)
+                    else:
+                        result.done.append(target)
+                    return
+                except discord.HTTPException as e:
+                    if e.status >= 500 and attempt < SERVER_ERROR_RETRIES:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    print(f"[ERROR] Bulk action failed for {target}: {e}")
+                    result.failed.append(target)
+                    return
+                except Exception as e:
+                    print(f"[ERROR] Bulk action failed for {target}: {e}")
+                    result.failed.append(target)
+                    return
+
+    async def report():
+        reported = 0
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            if result.finished == reported:
+                continue
+            reported = result.finished
+            try:
+                await progress(result)
+            except discord.HTTPException as e:
+                print(f"[ERROR] Failed to report bulk progress: {e}")
+
+    ticker = asyncio.get_running_loop().create_task(report()) if progress else None
+    try:
+        await asyncio.gather(*(run_one(target) for target in targets))
+    finally:
+        if ticker:
+            ticker.cancel()
+    return result
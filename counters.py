@@ -0,0 +1,159 @@
+import asyncio
+
+from .storage import db
+
+# How long the writer waits for more events before committing a batch.
+FLUSH_INTERVAL = 0.25
+MAX_BATCH = 500
+
+# ─── Invite & Claim Counters ───────────────────────────────────────────────────
+#
+# Every change to invite_stats, members and claims goes through one queue. A
+# single writer commits whatever has queued up as one transaction, in arrival
+# order, so concurrent events can never interleave half-applied updates and a
+# raid costs one commit per FLUSH_INTERVAL instead of one per member.
+#
+# Callers await their own event's result (was the join new, what did the member
+# row hold, the new claim total), exactly as if they had called storage directly.
+# Subscribers such as invite_index are told about every committed event
+# synchronously and in commit order, before any caller resumes, so an in-memory
+# copy sees exactly the database's sequence of increments and resets. Reads
+# that must line up with that sequence (an index snapshot) go through the same
+# queue.
+
+class CounterService:
+    def __init__(self, store=db):
+        self.store = store
+        self.queue = []
+        self.writer = None
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def _submit(self, kind, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((kind, args, future))
+        if self.writer is None or self.writer.done():
+            self.writer = loop.create_task(self._write_loop())
+        return future
+
+    async def record_join(self, guild_id, member_id, inviter_id, fake):
+        return await self._submit("join", guild_id, member_id, inviter_id, fake)
+
+    async def record_leave(self, guild_id, member_id):
+        return await self._submit("leave", guild_id, member_id)
+
+    async def add_claims(self, guild_id, user_id, delta):
+        return await self._submit("claims", guild_id, user_id, delta)
+
+    async def reset_invites(self, guild_id, user_id=None):
+        return await self._submit("reset", guild_id, user_id)
+
+    async def read_invite_stats(self, guild_id):
+        return await self._submit("stats", guild_id)
+
+    async def flush(self):
+        while self.writer is not None and not self.writer.done():
+            await asyncio.shield(self.writer)
+
+    async def _write_loop(self):
+        while self.queue:
+            if len(self.queue) < MAX_BATCH:
+                await asyncio.sleep(FLUSH_INTERVAL)
+            batch, self.queue = self.queue[:MAX_BATCH], self.queue[MAX_BATCH:]
+            events = [(kind, args) for kind, args, _ in batch]
+            try:
+                results = await self.store.apply_counter_events(events)
+            except Exception as e:
+                print(f"[ERROR] Counter batch of {len(batch)} failed, retrying one by one: {e}")
+                results = []
+                for event in events:
+                    try:
+                        results.append((await self.store.apply_counter_events([event]))[0])
+                    except Exception as e:
+                        results.append(e)
+
+            for (kind, args, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    if not future.done():
+                        future.set_exception(result)
+                    continue
+                for callback in self.subscribers:
+                    try:
+                        callback(kind, args, result)
+                    except Exception as e:
+                        print(f"[ERROR] Counter subscriber failed on {kind} event: {e}")
+                if not future.done():
+                    future.set_result(result)
+
+# Shared by every cog.
+counters = CounterService()
+
+# ─── Stress Check ──────────────────────────────────────────────────────────────
+#
+#     python -m cogs.counters
+#
+# Fires thousands of concurrent joins, leaves and claim changes at a scratch
+# database and checks that every single one is reflected in the totals.
+
+async def _stress(events=5000, guilds=3, inviters=20):
+    import os
+    import random
+    import tempfile
+    import time
+
+    from .storage import AsyncStorage, Storage
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = CounterService(AsyncStorage(Storage(os.path.join(directory, "stress.sqlite3"))))
+        expected = {}
+        claims = {}
+        members = []
+
+        async def join(guild_id, member_id):
+            inviter_id = random.randrange(inviters) + 1
+            fake = random.random() < 0.2
+            if await service.record_join(guild_id, member_id, inviter_id, fake):
+                counts = expected.setdefault((guild_id, inviter_id), [0, 0, 0])
+                counts[2 if fake else 0] += 1
+                members.append((guild_id, member_id))
+
+        async def leave(guild_id, member_id):
+            info = await service.record_leave(guild_id, member_id)
+            if info:
+                expected[(guild_id, info["inviter_id"])][1] += 1
+
+        async def claim(guild_id, user_id):
+            await service.add_claims(guild_id, user_id, 1)
+            claims[(guild_id, user_id)] = claims.get((guild_id, user_id), 0) + 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(
+            join(random.randrange(guilds) + 1, member_id) for member_id in range(1000, 1000 + events)
+        ))
+        # Duplicate join events for the same members must not count twice.
+        await asyncio.gather(*(join(guild_id, member_id) for guild_id, member_id in members[:events // 10]))
+        await asyncio.gather(
+            *(leave(guild_id, member_id) for guild_id, member_id in random.sample(members, len(members) // 3)),
+            *(claim(random.randrange(guilds) + 1, random.randrange(inviters) + 1) for _ in range(events))
+        )
+        elapsed = time.monotonic() - started
+
+        lost = 0
+        for guild_id in range(1, guilds + 1):
+            stored = await service.store.all_invite_stats(guild_id)
+            for user_id in range(1, inviters + 1):
+                want = expected.get((guild_id, user_id), [0, 0, 0])
+                got = stored.get(user_id, {"joined": 0, "left": 0, "fake": 0})
+                lost += sum(abs(w - g) for w, g in zip(want, (got["joined"], got["left"], got["fake"])))
+                lost += abs(claims.get((guild_id, user_id), 0) - await service.store.get_claims(guild_id, user_id))
+
+        total = events + events // 10 + len(members) // 3 + events
+        print(f"{total} events in {elapsed:.2f}s, {lost} lost update(s)")
+        return lost
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if asyncio.run(_stress()) else 0)
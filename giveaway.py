@@ -1,9 +1,28 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import os, json, asyncio, random
+import asyncio, heapq, random
+from array import array
+from bisect import bisect_left
 from datetime import datetime, timedelta, timezone
 
+from .guild_settings import settings
+from .invite_index import invite_index
+from .io_pool import run_io
+from .scheduler import scheduler
+from .storage import db, import_legacy_giveaways, storage
+from .user_cache import user_cache
+
+# Minimum seconds between two edits of the same giveaway message.
+EMBED_UPDATE_INTERVAL = 5
+
+# Bumped whenever GiveawayView's custom_ids change; older messages get their
+# view re-attached once at startup.
+GIVEAWAY_VIEW_VERSION = 1
+
+# Maximum number of legacy giveaway messages repaired at the same time.
+RESTORE_CONCURRENCY = 5
+
 # ─── Utilities ─────────────────────────────────────────────────────────────────
 
 def parse_duration(duration: str):
@@ -20,18 +39,72 @@ def parse_duration(duration: str):
             return None
     return total if total > 0 else None
 
+# ─── Entry Storage ─────────────────────────────────────────────────────────────
+
+class EntrySet:
+    # Sorted int64 array of user IDs: 8 bytes per entrant instead of a set slot
+    # plus a boxed int. Membership is a binary search, and winners are drawn by
+    # index so ending a giveaway never copies the entries. Extra tickets (e.g.
+    # booster entries) are rare and kept in a small side dict.
+    __slots__ = ("ids", "bonus")
+
+    def __init__(self, ids=None, bonus=None):
+        # `ids` must already be sorted and unique (storage returns it that way).
+        self.ids = ids if ids is not None else array("q")
+        self.bonus = bonus or {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, uid):
+        i = bisect_left(self.ids, uid)
+        return i < len(self.ids) and self.ids[i] == uid
+
+    def add(self, uid, extra=0):
+        i = bisect_left(self.ids, uid)
+        if i < len(self.ids) and self.ids[i] == uid:
+            return False
+        self.ids.insert(i, uid)
+        if extra:
+            self.bonus[uid] = extra
+        return True
+
+    def sample(self, k):
+        if not self.bonus:
+            return [self.ids[i] for i in random.sample(range(len(self.ids)), min(k, len(self.ids)))]
+        # Weighted draw without replacement (Efraimidis-Spirakis): every entrant
+        # gets a random key skewed by its ticket count and the k largest win.
+        return heapq.nlargest(k, self.ids, key=lambda uid: random.random() ** (1 / (1 + self.bonus.get(uid, 0))))
+
 # ─── Live Giveaway Embed ─────────────────────────────────────────────────────────
 
-def create_giveaway_embed(prize, end_time, host, entries, winners):
+def describe_requirements(requirements):
+    lines = []
+    if requirements.get("role"):
+        lines.append(f"Required role: <@&{requirements['role']}>")
+    if requirements.get("min_invites"):
+        lines.append(f"Minimum invites: {requirements['min_invites']}")
+    if requirements.get("min_account_age"):
+        lines.append(f"Minimum account age: {timedelta(seconds=requirements['min_account_age'])}")
+    if requirements.get("booster_entries"):
+        lines.append(f"Server boosters get **+{requirements['booster_entries']}** entries")
+    return lines
+
+def create_giveaway_embed(prize, end_time, host, entries, winners, requirements=None):
     ts = int(end_time.timestamp())
+    host_mention = getattr(host, "mention", f"<@{host.id}>")
+    description = (
+        f"Hosted by: {host_mention}\n"
+        f"Entries: {entries}\n"
+        f"Winners: {winners}\n"
+        f"Time: <t:{ts}:R>"
+    )
+    requirement_lines = describe_requirements(requirements or {})
+    if requirement_lines:
+        description += "\n\n**Requirements**\n" + "\n".join(requirement_lines)
     embed = discord.Embed(
         title=f"{prize}",
-        description=(
-            f"Hosted by: {host.mention}\n"
-            f"Entries: {entries}\n"
-            f"Winners: {winners}\n"
-            f"Time: <t:{ts}:R>"
-        ),
+        description=description,
         color=discord.Color.red()
     )
     return embed
@@ -43,10 +116,13 @@ class GiveawayView(discord.ui.View):
         super().__init__(timeout=None)
         self.cog = cog
         self.gid = giveaway_id
+        # A stable custom_id lets bot.add_view route clicks after a restart
+        # without touching the message.
+        self.enter_button.custom_id = f"giveaway:enter:{giveaway_id}"
 
     @discord.ui.button(label="🎉 Enter Giveaway", style=discord.ButtonStyle.primary)
     async def enter_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        g = self.cog.giveaways.get(self.gid)
+        g = self.cog.get_giveaway(self.gid, interaction.guild.id)
         if not g:
             return await interaction.response.send_message("⚠️ This giveaway has ended.", ephemeral=True)
 
@@ -54,16 +130,19 @@ class GiveawayView(discord.ui.View):
         if uid in g["entries"]:
             return await interaction.response.send_message("❌ You’ve already entered!", ephemeral=True)
 
-        g["entries"].add(uid)
-        self.cog.save_giveaways(interaction.guild.id)
-        await interaction.response.send_message("✅ You have entered!", ephemeral=True)
+        problem = await self.cog.check_requirements(g, interaction.user)
+        if problem:
+            return await interaction.response.send_message(problem, ephemeral=True)
 
-        host_user = interaction.guild.get_member(g["host"]) or self.cog.bot.get_user(g["host"])
-        await g["message"].edit(
-            embed=create_giveaway_embed(
-                g["prize"], g["end_time"], host_user, len(g["entries"]), g["winners"]
-            )
-        )
+        extra = self.cog.bonus_entries(g, interaction.user)
+        if not g["entries"].add(uid, extra):
+            return await interaction.response.send_message("❌ You’ve already entered!", ephemeral=True)
+        if extra:
+            await interaction.response.send_message(f"✅ You have entered with **{1 + extra}** entries!", ephemeral=True)
+        else:
+            await interaction.response.send_message("✅ You have entered!", ephemeral=True)
+        await db.add_giveaway_entry(self.gid, uid, 1 + extra)
+        self.cog.mark_dirty(self.gid)
 
 # ─── The Modal ─────────────────────────────────────────────────────────────────
 
@@ -72,148 +151,254 @@ class GiveawayModal(discord.ui.Modal, title="Giveaway Setup"):
     winners = discord.ui.TextInput(label="Number of Winners", placeholder="e.g. 1", required=True)
     prize = discord.ui.TextInput(label="Prize", placeholder="e.g. Nitro, $10", required=True)
 
-    def __init__(self, cog, interaction):
+    def __init__(self, cog, interaction, requirements=None):
         super().__init__()
         self.cog = cog
         self.interaction = interaction
+        self.requirements = requirements or {}
 
     async def on_submit(self, interaction: discord.Interaction):
+        # Posting and saving the giveaway can outlast the 3-second response window.
+        await interaction.response.defer(ephemeral=True)
+
         sec = parse_duration(self.duration.value)
         if sec is None:
-            return await interaction.response.send_message("❌ Invalid duration format!", ephemeral=True)
+            return await interaction.followup.send("❌ Invalid duration format!", ephemeral=True)
 
         try:
             win_count = int(self.winners.value)
         except ValueError:
-            return await interaction.response.send_message("❌ Number of winners must be a number!", ephemeral=True)
+            return await interaction.followup.send("❌ Number of winners must be a number!", ephemeral=True)
 
         end_time = datetime.now(timezone.utc) + timedelta(seconds=sec)
         host_id = self.interaction.user.id
-        embed = create_giveaway_embed(self.prize.value, end_time, self.interaction.user, 0, win_count)
-        view = GiveawayView(self.cog, None)
-        message = await interaction.channel.send(embed=embed, view=view)
+        embed = create_giveaway_embed(
+            self.prize.value, end_time, self.interaction.user, 0, win_count, self.requirements
+        )
+        message = await interaction.channel.send(embed=embed)
         gid = message.id
-        view.gid = gid
+        # The custom_id embeds the message id, so the view is attached once it is known.
+        await message.edit(view=GiveawayView(self.cog, gid))
 
-        self.cog.giveaways[gid] = {
+        self.cog.add_giveaway(gid, {
             "prize": self.prize.value,
             "winners": win_count,
             "end_time": end_time,
             "host": host_id,
+            "guild": interaction.guild.id,
             "channel": interaction.channel.id,
             "message": message,
-            "entries": set()
-        }
-        self.cog.save_giveaways(interaction.guild.id)
-        self.cog.bot.loop.create_task(self.cog.update_giveaway_message(gid))
+            "entries": EntrySet(),
+            "requirements": self.requirements,
+            "rendered_entries": 0,
+            "last_edit": 0.0,
+            "view_version": GIVEAWAY_VIEW_VERSION
+        })
+        await self.cog.save_giveaway(gid)
+        await scheduler.schedule("giveaway_end", gid, end_time, {"guild": interaction.guild.id})
 
-        await interaction.response.send_message(f"✅ Giveaway started in {interaction.channel.mention}!", ephemeral=True)
+        await interaction.followup.send(f"✅ Giveaway started in {interaction.channel.mention}!", ephemeral=True)
 
 # ─── The Cog ───────────────────────────────────────────────────────────────────
 
 class Giveaway(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Partitioned by guild so per-guild work never walks other guilds'
+        # giveaways; giveaway_guilds maps a giveaway id back to its partition.
         self.giveaways = {}
-        os.makedirs("giveaway", exist_ok=True)
-        self.bot.loop.create_task(self.load_giveaways())
-
-    async def load_giveaways(self):
+        self.giveaway_guilds = {}
+        self.pending_edits = {}
+
+    def get_giveaway(self, gid, guild_id=None):
+        if guild_id is None:
+            guild_id = self.giveaway_guilds.get(gid)
+        return self.giveaways.get(guild_id, {}).get(gid)
+
+    def add_giveaway(self, gid, g):
+        self.giveaways.setdefault(g["guild"], {})[gid] = g
+        self.giveaway_guilds[gid] = g["guild"]
+
+    def remove_giveaway(self, gid):
+        guild_id = self.giveaway_guilds.pop(gid, None)
+        partition = self.giveaways.get(guild_id)
+        if partition is None:
+            return None
+        g = partition.pop(gid, None)
+        if not partition:
+            del self.giveaways[guild_id]
+        return g
+
+    # Runs during load_extension, before the gateway connects: the registry and
+    # the persistent views are in place by the time the first click arrives.
+    async def cog_load(self):
+        legacy = await self.restore_giveaways(await db.load_giveaways())
+        self.bot.loop.create_task(self.finish_restore(legacy))
+
+    async def restore_giveaways(self, rows):
+        legacy = []
+        for g in rows:
+            gid = g["giveaway_id"]
+            entries = EntrySet(await db.giveaway_entries(gid), await db.giveaway_bonus_tickets(gid))
+            channel = self.bot.get_partial_messageable(g["channel_id"], guild_id=g["guild_id"])
+
+            self.add_giveaway(gid, {
+                "prize": g["prize"],
+                "winners": g["winners"],
+                "end_time": datetime.fromisoformat(g["end_time"]),
+                "host": g["host_id"],
+                "guild": g["guild_id"],
+                "channel": g["channel_id"],
+                "message": channel.get_partial_message(gid),
+                "entries": entries,
+                "requirements": g["requirements"],
+                "rendered_entries": len(entries),
+                "last_edit": 0.0,
+                "view_version": g["view_version"]
+            })
+            if g["view_version"] >= GIVEAWAY_VIEW_VERSION:
+                self.bot.add_view(GiveawayView(self, gid), message_id=gid)
+            else:
+                legacy.append(gid)
+        return legacy
+
+    async def finish_restore(self, legacy):
         await self.bot.wait_until_ready()
-        for fn in os.listdir("giveaway"):
-            if not fn.endswith(".json"): continue
-            guild_id = int(fn[:-5])
-            path = os.path.join("giveaway", fn)
-            with open(path) as f:
-                data = json.load(f)
-            guild = self.bot.get_guild(guild_id)
-            if not guild: continue
-            for gid_str, g in data.items():
-                gid = int(gid_str)
-                channel = guild.get_channel(g["channel"])
-                if not channel: continue
-                try:
-                    message = await channel.fetch_message(g["message"])
-                except discord.NotFound:
-                    continue
-
-                end_time = datetime.fromisoformat(g["end_time"])
-                entries = set(g.get("entries", []))
-
-                self.giveaways[gid] = {
-                    "prize": g["prize"],
-                    "winners": g["winners"],
-                    "end_time": end_time,
-                    "host": g["host"],
-                    "channel": g["channel"],
-                    "message": message,
-                    "entries": entries
-                }
-                view = GiveawayView(self, gid)
-                await message.edit(view=view)
-                self.bot.loop.create_task(self.update_giveaway_message(gid))
-
-    def save_giveaways(self, guild_id):
-        path = os.path.join("giveaway", f"{guild_id}.json")
-        to_save = {}
-        for gid, g in self.giveaways.items():
-            if self.bot.get_channel(g["channel"]):
-                to_save[gid] = {
-                    "prize": g["prize"],
-                    "winners": g["winners"],
-                    "end_time": g["end_time"].isoformat(),
-                    "host": g["host"],
-                    "channel": g["channel"],
-                    "message": g["message"].id,
-                    "entries": list(g["entries"])
-                }
-        with open(path, "w") as f:
-            json.dump(to_save, f, indent=4)
-
-    async def update_giveaway_message(self, gid: int):
-        while gid in self.giveaways:
-            g = self.giveaways[gid]
-            now = datetime.now(timezone.utc)
-            if now >= g["end_time"]:
-                return await self.end_giveaway(gid)
-            host_member = (
-                g["message"].guild.get_member(g["host"]) or self.bot.get_user(g["host"])  
-            )
-            embed = create_giveaway_embed(
-                g["prize"],
-                g["end_time"],
-                host_member,
-                len(g["entries"]),
-                g["winners"]
-            )
+        channel_guilds = {channel.id: guild.id for guild in self.bot.guilds for channel in guild.channels}
+        imported = await run_io(import_legacy_giveaways, storage, channel_guilds)
+        if imported:
+            rows = [g for g in await db.load_giveaways() if g["giveaway_id"] in imported]
+            legacy += await self.restore_giveaways(rows)
+        scheduler.register("giveaway_end", self.on_giveaway_end)
+        await scheduler.start()
+        await self.upgrade_views(legacy)
+
+    async def upgrade_views(self, gids):
+        semaphore = asyncio.Semaphore(RESTORE_CONCURRENCY)
+        await asyncio.gather(*(self.upgrade_view(gid, semaphore) for gid in gids))
+
+    # Messages posted before GIVEAWAY_VIEW_VERSION carry random custom_ids, so
+    # they need one edit to receive the persistent button.
+    async def upgrade_view(self, gid, semaphore):
+        async with semaphore:
+            g = self.get_giveaway(gid)
+            if not g:
+                return
             try:
-                await g["message"].edit(embed=embed)
-            except:
-                pass
-            await asyncio.sleep(10)
+                await g["message"].edit(embed=self.build_embed(g), view=GiveawayView(self, gid))
+                g["view_version"] = GIVEAWAY_VIEW_VERSION
+            except discord.NotFound:
+                self.remove_giveaway(gid)
+                await db.delete_giveaway(gid)
+                return
+            except discord.HTTPException as e:
+                print(f"[ERROR] Failed to restore giveaway {gid}: {e}")
+            await self.save_giveaway(gid)
+            # Giveaways imported from the old JSON files have no end job yet.
+            await scheduler.schedule("giveaway_end", gid, g["end_time"], {"guild": g["guild"]})
+
+    def cog_unload(self):
+        scheduler.unregister("giveaway_end")
+
+    async def on_giveaway_end(self, key, payload):
+        await self.end_giveaway(int(key), (payload or {}).get("guild"))
+
+    async def save_giveaway(self, gid):
+        g = self.get_giveaway(gid)
+        await db.save_giveaway(g["guild"], gid, {
+            "prize": g["prize"],
+            "winners": g["winners"],
+            "end_time": g["end_time"].isoformat(),
+            "host": g["host"],
+            "channel": g["channel"],
+            "view_version": g["view_version"],
+            "requirements": g["requirements"]
+        })
+
+    # Entry requirements are checked against data that is already in memory:
+    # the member's roles from the gateway and the shared invite index.
+    async def check_requirements(self, g, member):
+        requirements = g["requirements"]
+        role_id = requirements.get("role")
+        if role_id and not member.get_role(role_id):
+            return f"❌ You need the <@&{role_id}> role to enter this giveaway."
+
+        min_age = requirements.get("min_account_age")
+        if min_age and (discord.utils.utcnow() - member.created_at).total_seconds() < min_age:
+            return f"❌ Your account must be at least {timedelta(seconds=min_age)} old to enter this giveaway."
+
+        min_invites = requirements.get("min_invites")
+        if min_invites:
+            if not invite_index.is_loaded(member.guild.id):
+                await invite_index.load(member.guild.id)
+            net = invite_index.net(member.guild.id, member.id)
+            if net < min_invites:
+                return f"❌ You need at least **{min_invites}** invites to enter this giveaway (you have {net})."
+        return None
+
+    def bonus_entries(self, g, member):
+        if member.premium_since:
+            return g["requirements"].get("booster_entries", 0)
+        return 0
+
+    def build_embed(self, g):
+        guild = self.bot.get_guild(g["guild"])
+        host_member = (
+            (guild and guild.get_member(g["host"])) or self.bot.get_user(g["host"])
+            or user_cache.get(g["host"]) or discord.Object(g["host"])
+        )
+        return create_giveaway_embed(
+            g["prize"], g["end_time"], host_member, len(g["entries"]), g["winners"], g["requirements"]
+        )
 
-    async def end_giveaway(self, gid: int):
-        g = self.giveaways.pop(gid, None)
+    # Entries only mark a giveaway dirty; at most one edit per giveaway goes out
+    # every EMBED_UPDATE_INTERVAL seconds, and only if the entry count changed.
+    def mark_dirty(self, gid: int):
+        g = self.get_giveaway(gid)
+        if not g or gid in self.pending_edits or len(g["entries"]) == g["rendered_entries"]:
+            return
+        self.pending_edits[gid] = self.bot.loop.create_task(self.flush_embed(gid))
+
+    async def flush_embed(self, gid: int):
+        try:
+            g = self.get_giveaway(gid)
+            if not g:
+                return
+            delay = g["last_edit"] + EMBED_UPDATE_INTERVAL - self.bot.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self.pending_edits.pop(gid, None)
+
+        g = self.get_giveaway(gid)
+        if not g or len(g["entries"]) == g["rendered_entries"]:
+            return
+        # Clicks that land while this edit is in flight schedule the next one.
+        g["rendered_entries"] = len(g["entries"])
+        g["last_edit"] = self.bot.loop.time()
+        try:
+            await g["message"].edit(embed=self.build_embed(g))
+        except discord.HTTPException as e:
+            print(f"[ERROR] Failed to update giveaway {gid}: {e}")
+            g["rendered_entries"] = None
+
+    # The giveaway stays registered until its announcement is out: if sending
+    # fails, the error reaches the scheduler and the retry finds it again.
+    async def end_giveaway(self, gid: int, guild_id=None):
+        g = self.get_giveaway(gid, guild_id)
         if not g:
             return
 
         channel = self.bot.get_channel(g["channel"])
-        participants = list(g["entries"])
-        host_user = channel.guild.get_member(g["host"]) or self.bot.get_user(g["host"]) 
+        if channel is None:
+            print(f"[ERROR] Giveaway {gid} ended, but its channel {g['channel']} is gone; discarding it")
+            await self.discard_giveaway(gid)
+            return
+        participants = g["entries"]
 
         # Determine ticket channel from /logs settings
-        settings_path = f"server_data/{channel.guild.id}_settings.json"
-        ticket_channel = None
-        if os.path.exists(settings_path):
-            try:
-                with open(settings_path) as sf:
-                    settings_data = json.load(sf)
-                ch_id = settings_data.get("giveaway_log")
-                if ch_id:
-                    ticket_channel = f"<#{ch_id}>"
-            except Exception:
-                pass
-        ticket_channel = ticket_channel or "#open_ticket_channel"
+        ch_id = settings.get(channel.guild.id, "giveaway_log")
+        ticket_channel = f"<#{ch_id}>" if ch_id else "#open_ticket_channel"
 
         win_embed = discord.Embed(
             title=" 🎉 Congratulations!",
@@ -224,16 +409,19 @@ class Giveaway(commands.Cog):
         winner_mentions = []
 
         if participants:
-            winners = random.sample(participants, min(len(participants), g['winners']))
+            winners = participants.sample(g['winners'])
+            users = await user_cache.resolve_many(self.bot, [g["host"], *winners], channel.guild)
+            host_user = users[g["host"]]
             for uid in winners:
-                user = channel.guild.get_member(uid) or await self.bot.fetch_user(uid)
-                if user:
-                    winner_mentions.append(user.mention)
+                if users[uid]:
+                    winner_mentions.append(users[uid].mention)
             desc_lines.append(f"**Winner(s):** {', '.join(winner_mentions)}")
         else:
             desc_lines.append("**Winner(s):** No valid entries.")
+            host_user = await user_cache.resolve(self.bot, g["host"], channel.guild)
 
-        desc_lines.append(f"**Hosted by:** {host_user.mention}")
+        host_mention = host_user.mention if host_user else f"<@{g['host']}>"
+        desc_lines.append(f"**Hosted by:** {host_mention}")
         desc_lines.append("\n--------------------------")
         desc_lines.append(f"- Open a ticket in {ticket_channel}")
         desc_lines.append("- Please take a screenshot of this message and send it in your claim ticket!")
@@ -246,7 +434,14 @@ class Giveaway(commands.Cog):
         else:
             await channel.send(embed=win_embed)
 
-        self.save_giveaways(channel.guild.id)
+        await self.discard_giveaway(gid)
+
+    async def discard_giveaway(self, gid):
+        self.remove_giveaway(gid)
+        pending = self.pending_edits.pop(gid, None)
+        if pending:
+            pending.cancel()
+        await db.delete_giveaway(gid)
 
     # Helper method to check if user has Staff Team or higher role
     def has_staff_or_above(self, member: discord.Member):
@@ -257,7 +452,20 @@ class Giveaway(commands.Cog):
         return member_highest >= staff_role
 
     @app_commands.command(name="gcreate", description="Create a giveaway via form")
-    async def gcreate(self, interaction: discord.Interaction):
+    @app_commands.describe(
+        required_role="(Optional) Role members need to enter",
+        min_invites="(Optional) Minimum net invites needed to enter",
+        min_account_age="(Optional) Minimum account age, e.g. 7d",
+        booster_entries="(Optional) Extra entries for server boosters"
+    )
+    async def gcreate(
+        self,
+        interaction: discord.Interaction,
+        required_role: discord.Role = None,
+        min_invites: int = None,
+        min_account_age: str = None,
+        booster_entries: int = None
+    ):
         member = interaction.user
         if not isinstance(member, discord.Member):
             return await interaction.response.send_message("❌ You must be in a server to use this command.", ephemeral=True)
@@ -265,7 +473,22 @@ class Giveaway(commands.Cog):
         if not self.has_staff_or_above(member):
             return await interaction.response.send_message("❌ You do not have permission to use this command.", ephemeral=True)
 
-        await interaction.response.send_modal(GiveawayModal(self, interaction))
+        requirements = {}
+        if required_role:
+            requirements["role"] = required_role.id
+        if min_invites:
+            requirements["min_invites"] = min_invites
+        if min_account_age:
+            age = parse_duration(min_account_age)
+            if age is None:
+                return await interaction.response.send_message("❌ Invalid account age format!", ephemeral=True)
+            requirements["min_account_age"] = age
+        if booster_entries:
+            if booster_entries < 0:
+                return await interaction.response.send_message("❌ Booster entries can't be negative!", ephemeral=True)
+            requirements["booster_entries"] = booster_entries
+
+        await interaction.response.send_modal(GiveawayModal(self, interaction, requirements))
 
 async def setup(bot):
     await bot.add_cog(Giveaway(bot))
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import threading
+
+from .io_pool import run_io
+
+SETTINGS_DIR = "server_data"
+
+# ─── Guild Settings Cache ───────────────────────────────────────────────────────
+#
+# server_data/{guild_id}_settings.json is read once per guild and then served
+# from memory. Writes update the cache and replace the file atomically, so a
+# crash mid-write can never leave a truncated settings file behind.
+
+class GuildSettings:
+    def __init__(self, directory=SETTINGS_DIR):
+        self.directory = directory
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_path(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}_settings.json")
+
+    def _load(self, guild_id):
+        data = self._cache.get(guild_id)
+        if data is not None:
+            return data
+
+        data = {}
+        path = self.get_path(guild_id)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[ERROR] Failed to load settings for guild {guild_id}: {e}")
+                data = {}
+        self._cache[guild_id] = data
+        return data
+
+    def _write(self, guild_id, data):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{guild_id}_settings.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.get_path(guild_id))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, guild_id, key, default=None):
+        return self._load(guild_id).get(key, default)
+
+    def set(self, guild_id, key, value):
+        with self._lock:
+            data = dict(self._load(guild_id))
+            data[key] = value
+            self._write(guild_id, data)
+            self._cache[guild_id] = data
+
+    async def update(self, guild_id, key, value):
+        await run_io(self.set, guild_id, key, value)
+
+    async def preload(self, guild_ids):
+        await run_io(lambda: [self._load(guild_id) for guild_id in guild_ids])
+
+    def get_channel(self, guild, key):
+        channel_id = self.get(guild.id, key)
+        return guild.get_channel(channel_id) if channel_id else None
+
+    def invalidate(self, guild_id=None):
+        if guild_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild_id, None)
+
+# Shared by every cog so each guild's file is only parsed once per process.
+settings = GuildSettings()
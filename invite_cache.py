@@ -0,0 +1,203 @@
+import asyncio
+import time
+
+import discord
+
+from .storage import db
+
+# How long usage seen in a snapshot can wait for its member's join event.
+UNCLAIMED_TTL = 30
+
+# Concurrent guild.invites() calls during startup warm-up. discord.py already
+# waits out 429s per route; this keeps the burst well under the global limit.
+WARMUP_CONCURRENCY = 5
+
+# ─── Invite Snapshot Cache ─────────────────────────────────────────────────────
+#
+# Keeps {code: (uses, inviter_id, max_uses)} per guild. Joins are attributed by
+# diffing a fresh guild.invites() snapshot against the cached one in O(invites).
+#
+# Joins that arrive while a snapshot is being fetched queue for the next one, so
+# a raid costs one fetch per round trip instead of one (or two) per member. Any
+# usage the diff finds beyond the queued joins is kept briefly for join events
+# that are still on their way.
+#
+# Snapshots are written to storage in the background, and restored on startup
+# so joins can be attributed before the warm-up refresh reaches their guild.
+# Each save only upserts the codes that changed since the last one.
+
+class InviteCache:
+    def __init__(self):
+        self.snapshots = {}
+        self.versions = {}
+        self.stale = set()
+        self.pending = {}
+        self.fetching = {}
+        self.unclaimed = {}
+        self.unsaved = set()
+        self.saved = {}
+        self.saver = None
+        self.warmup_started = False
+
+    @staticmethod
+    def _snapshot(invites):
+        return {
+            invite.code: (invite.uses or 0, invite.inviter.id if invite.inviter else None, invite.max_uses or 0)
+            for invite in invites
+        }
+
+    def _store(self, guild_id, snapshot):
+        self.snapshots[guild_id] = snapshot
+        self.versions[guild_id] = self.versions.get(guild_id, 0) + 1
+        self.stale.discard(guild_id)
+        self._persist(guild_id)
+
+    async def restore(self):
+        for guild_id, snapshot in (await db.load_invite_snapshots()).items():
+            self.saved.setdefault(guild_id, dict(snapshot))
+            if guild_id not in self.snapshots:
+                self.snapshots[guild_id] = snapshot
+                self.stale.add(guild_id)
+
+    async def refresh(self, guild):
+        version = self.versions.get(guild.id, 0)
+        try:
+            snapshot = self._snapshot(await guild.invites())
+        except discord.Forbidden:
+            snapshot = {}
+        except discord.HTTPException as e:
+            print(f"Error fetching invites for {guild.name}: {e}")
+            return
+        # A join may have stored a newer snapshot while this one was in flight.
+        if self.versions.get(guild.id, 0) == version:
+            self._store(guild.id, snapshot)
+
+    # Runs once per process; on_ready fires again after every reconnect.
+    async def warm_up(self, guilds):
+        if self.warmup_started:
+            return
+        self.warmup_started = True
+
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+        async def refresh(guild):
+            async with semaphore:
+                await self.refresh(guild)
+
+        await asyncio.gather(*(refresh(guild) for guild in guilds))
+
+    def add_invite(self, invite):
+        snapshot = self.snapshots.get(invite.guild.id)
+        if snapshot is not None:
+            snapshot[invite.code] = (invite.uses or 0, invite.inviter.id if invite.inviter else None, invite.max_uses or 0)
+            self._persist(invite.guild.id)
+
+    # An invite with exactly one use left is deleted the moment it is used up,
+    # so it stays in the snapshot for the diff to credit. Any other deleted
+    # invite was revoked (or expired) and must never be credited; drop it now.
+    def remove_invite(self, invite):
+        snapshot = self.snapshots.get(invite.guild.id)
+        entry = snapshot.get(invite.code) if snapshot else None
+        if entry is None:
+            return
+        uses, _, max_uses = entry
+        if not (max_uses and max_uses - uses == 1):
+            del snapshot[invite.code]
+            self._persist(invite.guild.id)
+
+    async def attribute(self, guild):
+        inviter_id = self._claim(guild.id)
+        if inviter_id:
+            return inviter_id
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(guild.id, []).append(future)
+        if guild.id not in self.fetching:
+            self.fetching[guild.id] = asyncio.get_running_loop().create_task(self._drain(guild))
+        return await future
+
+    def _claim(self, guild_id):
+        credits = self.unclaimed.get(guild_id)
+        now = time.monotonic()
+        while credits:
+            expires, inviter_id = credits.pop(0)
+            if expires >= now:
+                return inviter_id
+        return None
+
+    async def _drain(self, guild):
+        try:
+            while self.pending.get(guild.id):
+                waiters = self.pending.pop(guild.id)
+                try:
+                    invites = await guild.invites()
+
+                    stale = guild.id in self.stale
+                    after = self._snapshot(invites)
+                    credits = self._diff(self.snapshots.get(guild.id, {}), after)
+                    self._store(guild.id, after)
+
+                    for waiter in waiters:
+                        inviter_id = credits.pop(0) if credits else self._claim(guild.id)
+                        if not waiter.done():
+                            waiter.set_result(inviter_id)
+                    # Against a snapshot restored from disk, extra usage is most
+                    # likely from joins during downtime; don't hand it out later.
+                    if credits and not stale:
+                        expires = time.monotonic() + UNCLAIMED_TTL
+                        self.unclaimed.setdefault(guild.id, []).extend((expires, inviter_id) for inviter_id in credits)
+                except Exception as e:
+                    print(f"Error checking invites: {e}")
+                finally:
+                    # Whatever went wrong, no join handler may wait forever.
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self.fetching.pop(guild.id, None)
+            for waiter in self.pending.pop(guild.id, []):
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    @staticmethod
+    def _diff(before, after):
+        credits = []
+        for code, (old_uses, inviter_id, max_uses) in before.items():
+            if not inviter_id:
+                continue
+            new = after.get(code)
+            if new is not None:
+                used = new[0] - old_uses
+            elif max_uses and max_uses - old_uses == 1:
+                # Vanished with one use left: most likely used up by this join.
+                used = 1
+            else:
+                used = 0
+            credits.extend([inviter_id] * max(0, used))
+        return credits
+
+    # ─── Persistence ───────────────────────────────────────────────────────────
+    #
+    # One writer drains the set of changed guilds in order, so a slow write can
+    # never land after (and overwrite) a newer snapshot of the same guild.
+
+    def _persist(self, guild_id):
+        self.unsaved.add(guild_id)
+        if self.saver is None or self.saver.done():
+            self.saver = asyncio.get_running_loop().create_task(self._save_loop())
+
+    async def _save_loop(self):
+        while self.unsaved:
+            guild_id = self.unsaved.pop()
+            try:
+                if guild_id not in self.saved:
+                    self.saved[guild_id] = await db.load_invite_snapshot(guild_id)
+                saved = self.saved[guild_id]
+                snapshot = dict(self.snapshots.get(guild_id, {}))
+                changed = {code: entry for code, entry in snapshot.items() if saved.get(code) != entry}
+                removed = [code for code in saved if code not in snapshot]
+                if changed or removed:
+                    await db.save_invite_snapshot(guild_id, changed, removed)
+                self.saved[guild_id] = snapshot
+            except Exception as e:
+                print(f"[ERROR] Failed to save invite snapshot for guild {guild_id}: {e}")
@@ -0,0 +1,137 @@
+import asyncio
+from bisect import bisect_left, insort
+
+from .counters import counters
+
+# ─── In-Memory Invite Index ────────────────────────────────────────────────────
+#
+# Per-guild copy of invite_stats kept in memory so hot paths (giveaway entry
+# requirements, /invites) never hit storage. Each guild is loaded once and then
+# kept current from the counter service: every committed join, leave and reset
+# reaches on_commit() in commit order.
+#
+# The load reads its snapshot through the same counter queue, so it sits at an
+# exact point in that order: changes committed before it are in it, changes
+# committed after it are buffered until the snapshot is installed and then
+# replayed. Nothing is counted twice or missed.
+#
+# Each guild also keeps a ranking: a sorted list of (-net, user_id) keys, so
+# top-N is a slice and a user's rank is one binary search.
+
+def _rank_key(user_id, counts):
+    return (-(counts[0] - counts[1] - counts[2]), user_id)
+
+
+class InviteIndex:
+    def __init__(self):
+        self.guilds = {}
+        self.rankings = {}
+        self.loading = {}
+        self.buffers = {}
+
+    def is_loaded(self, guild_id):
+        return guild_id in self.guilds
+
+    async def load(self, guild_id):
+        if guild_id in self.guilds:
+            return
+        task = self.loading.get(guild_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(guild_id))
+            self.loading[guild_id] = task
+        await asyncio.shield(task)
+
+    async def _load(self, guild_id):
+        try:
+            rows = await counters.read_invite_stats(guild_id)
+            guild = {
+                user_id: [s["joined"], s["left"], s["fake"]]
+                for user_id, s in rows.items() if s["joined"] or s["left"] or s["fake"]
+            }
+            self.rankings[guild_id] = sorted(_rank_key(user_id, counts) for user_id, counts in guild.items())
+            self.guilds[guild_id] = guild
+            for change in self.buffers.pop(guild_id, []):
+                if change[0] == "apply":
+                    self.apply(guild_id, *change[1:])
+                else:
+                    self.reset(guild_id, change[1])
+        finally:
+            self.loading.pop(guild_id, None)
+            self.buffers.pop(guild_id, None)
+
+    def on_commit(self, kind, args, result):
+        if kind == "join":
+            guild_id, _, inviter_id, fake = args
+            if result and inviter_id:
+                if fake:
+                    self.apply(guild_id, inviter_id, fake=1)
+                else:
+                    self.apply(guild_id, inviter_id, joined=1)
+        elif kind == "leave":
+            if result and result["inviter_id"]:
+                self.apply(args[0], result["inviter_id"], left=1)
+        elif kind == "reset":
+            self.reset(*args)
+        elif kind == "stats":
+            # The snapshot point: buffer what comes after it until it is installed.
+            if args[0] in self.loading and args[0] not in self.guilds:
+                self.buffers.setdefault(args[0], [])
+
+    def stats(self, guild_id, user_id):
+        joined, left, fake = self.guilds.get(guild_id, {}).get(user_id, (0, 0, 0))
+        return {"joined": joined, "left": left, "fake": fake}
+
+    def net(self, guild_id, user_id):
+        joined, left, fake = self.guilds.get(guild_id, {}).get(user_id, (0, 0, 0))
+        return joined - left - fake
+
+    def count(self, guild_id):
+        return len(self.rankings.get(guild_id, ()))
+
+    def top(self, guild_id, offset=0, limit=10):
+        keys = self.rankings.get(guild_id, [])[offset:offset + limit]
+        return [(user_id, self.stats(guild_id, user_id)) for _, user_id in keys]
+
+    def rank(self, guild_id, user_id):
+        counts = self.guilds.get(guild_id, {}).get(user_id)
+        if counts is None:
+            return None
+        return bisect_left(self.rankings[guild_id], _rank_key(user_id, counts)) + 1
+
+    def _unrank(self, guild_id, user_id, counts):
+        ranking = self.rankings[guild_id]
+        i = bisect_left(ranking, _rank_key(user_id, counts))
+        if i < len(ranking) and ranking[i][1] == user_id:
+            del ranking[i]
+
+    def apply(self, guild_id, user_id, joined=0, left=0, fake=0):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            if guild_id in self.buffers:
+                self.buffers[guild_id].append(("apply", user_id, joined, left, fake))
+            return
+        counts = guild.get(user_id)
+        if counts is None:
+            counts = guild[user_id] = [0, 0, 0]
+        else:
+            self._unrank(guild_id, user_id, counts)
+        counts[0] += joined
+        counts[1] += left
+        counts[2] += fake
+        insort(self.rankings[guild_id], _rank_key(user_id, counts))
+
+    def reset(self, guild_id, user_id=None):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            if guild_id in self.buffers:
+                self.buffers[guild_id].append(("reset", user_id))
+            return
+        if user_id is None:
+            guild.clear()
+            self.rankings[guild_id].clear()
+        elif user_id in guild:
+            self._unrank(guild_id, user_id, guild.pop(user_id))
+
+# Shared by every cog.
+invite_index = InviteIndex()
+counters.subscribe(invite_index.on_commit)
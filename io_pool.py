@@ -0,0 +1,82 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+IO_WORKERS = 4
+
+# ─── Blocking I/O Pool ─────────────────────────────────────────────────────────
+#
+# Every disk read/write and (de)serialization goes through run_io so the event
+# loop never waits on the filesystem. The pool is small on purpose: SQLite
+# serializes writers anyway and we only need to keep the loop free.
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="bot-io")
+
+async def run_io(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def shutdown_io():
+    _executor.shutdown(wait=True)
+
+# ─── Event Loop Lag Monitor ────────────────────────────────────────────────────
+#
+# Sleeps for a fixed interval and measures how late it wakes up. Any extra
+# delay is time the loop spent blocked in somebody else's callback.
+
+class LoopLagMonitor:
+    def __init__(self, interval=0.25, report_every=60.0, warn_threshold=0.1):
+        self.interval = interval
+        self.report_every = report_every
+        self.warn_threshold = warn_threshold
+        self.task = None
+        self.reset()
+
+    def reset(self):
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked = 0
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        return self.task
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def stats(self):
+        mean = self.total_lag / self.samples if self.samples else 0.0
+        return {
+            "samples": self.samples,
+            "mean_ms": mean * 1000,
+            "max_ms": self.max_lag * 1000,
+            "blocked": self.blocked,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.warn_threshold:
+                self.blocked += 1
+                print(f"[WARN] Event loop was blocked for {lag * 1000:.0f} ms")
+
+            if self.report_every and loop.time() - last_report >= self.report_every:
+                s = self.stats()
+                print(
+                    f"[LOOP] mean lag {s['mean_ms']:.1f} ms, max {s['max_ms']:.1f} ms, "
+                    f"{s['blocked']} stall(s) over {s['samples']} samples"
+                )
+                self.reset()
+                last_report = loop.time()
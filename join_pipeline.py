@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import deque
+
+import discord
+
+from .log_dispatcher import MAX_EMBED_CHARS_PER_MESSAGE, MAX_EMBEDS_PER_MESSAGE
+from .storage import db
+
+# Joins within RAID_WINDOW seconds that switch a guild to batched mode.
+RAID_THRESHOLD = 10
+RAID_WINDOW = 10
+
+# Batched mode ends once no burst has been seen for this many seconds.
+RAID_COOLDOWN = 30
+
+# Join-role assignments per second while batched: headroom over a raid of
+# 200 joins a minute, so the queue drains instead of growing.
+ROLE_RATE = 5
+
+# A welcome line is roughly 80 characters, so this stays under Discord's
+# 4096-character embed description limit.
+WELCOME_LINES_PER_EMBED = 40
+
+# ─── Raid-Mode Join Pipeline ───────────────────────────────────────────────────
+#
+# A sliding window of join timestamps per guild detects bursts. While a guild is
+# in raid mode, join roles go through one rate-limited worker instead of one
+# add_roles call per handler, and welcome messages are collected and sent as a
+# single message per RAID_WINDOW listing everyone who joined.
+
+class JoinPipeline:
+    def __init__(self):
+        self.windows = {}
+        self.raid_until = {}
+        self.role_queues = {}
+        self.role_workers = {}
+        self.welcomes = {}
+        self.welcome_flushers = {}
+
+    def record_join(self, guild):
+        now = time.monotonic()
+        window = self.windows.setdefault(guild.id, deque())
+        window.append(now)
+        while window and window[0] < now - RAID_WINDOW:
+            window.popleft()
+
+        if len(window) >= RAID_THRESHOLD:
+            if not self.is_raid(guild.id, now):
+                print(f"[INFO] Join burst in {guild.name}: switching to batched join handling")
+            self.raid_until[guild.id] = now + RAID_COOLDOWN
+        return self.is_raid(guild.id, now)
+
+    def is_raid(self, guild_id, now=None):
+        return self.raid_until.get(guild_id, 0) > (now or time.monotonic())
+
+    # ─── Join roles ────────────────────────────────────────────────────────────
+
+    def queue_role(self, member, role):
+        guild_id = member.guild.id
+        self.role_queues.setdefault(guild_id, deque()).append((member, role))
+        worker = self.role_workers.get(guild_id)
+        if worker is None or worker.done():
+            self.role_workers[guild_id] = asyncio.get_running_loop().create_task(self._role_worker(guild_id))
+
+    async def _role_worker(self, guild_id):
+        queue = self.role_queues[guild_id]
+        while queue:
+            member, role = queue.popleft()
+            try:
+                await member.add_roles(role, reason="Auto-assigned join role")
+                await db.set_member_role(guild_id, member.id, role.name)
+            except discord.Forbidden:
+                print(f"Missing permissions to assign role {role.name} in {member.guild.name}")
+            except discord.HTTPException as e:
+                # Typically the member already left again.
+                print(f"Failed to assign join role to {member}: {e}")
+            except Exception as e:
+                print(f"[ERROR] Failed to record join role for {member}: {e}")
+            await asyncio.sleep(1 / ROLE_RATE)
+
+    # ─── Welcome messages ──────────────────────────────────────────────────────
+
+    def queue_welcome(self, channel, line):
+        batch = self.welcomes.setdefault(channel.id, [])
+        batch.append(line)
+        flusher = self.welcome_flushers.get(channel.id)
+        if flusher is None or flusher.done():
+            self.welcome_flushers[channel.id] = asyncio.get_running_loop().create_task(self._flush_welcomes(channel))
+
+    async def _flush_welcomes(self, channel):
+        while True:
+            await asyncio.sleep(RAID_WINDOW)
+            lines = self.welcomes.pop(channel.id, [])
+            if not lines:
+                return
+
+            embeds = []
+            for start in range(0, len(lines), WELCOME_LINES_PER_EMBED):
+                embed = discord.Embed(
+                    title="🎉 Welcome!" if not embeds else None,
+                    description="\n".join(lines[start:start + WELCOME_LINES_PER_EMBED]),
+                    color=discord.Color.red()
+                )
+                embeds.append(embed)
+            embeds[-1].set_footer(text=f"{len(lines)} members joined • Member #{channel.guild.member_count}")
+
+            while embeds:
+                batch = [embeds.pop(0)]
+                size = len(batch[0])
+                while (
+                    embeds and len(batch) < MAX_EMBEDS_PER_MESSAGE
+                    and size + len(embeds[0]) <= MAX_EMBED_CHARS_PER_MESSAGE
+                ):
+                    size += len(embeds[0])
+                    batch.append(embeds.pop(0))
+                try:
+                    await channel.send(embeds=batch)
+                except discord.Forbidden:
+                    print(f"Missing permissions to send welcome message in {channel.name}")
+                    break
+                except discord.HTTPException as e:
+                    print(f"[ERROR] Failed to send {len(batch)} welcome embed(s) in {channel.name}: {e}")
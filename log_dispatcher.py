@@ -0,0 +1,88 @@
+import asyncio
+from collections import deque
+
+import discord
+
+# Discord's limits for a single message.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# How long a channel's worker waits for more entries before its first send.
+BATCH_DELAY = 0.5
+
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+
+# ─── Log Dispatcher ────────────────────────────────────────────────────────────
+#
+# Commands acknowledge their interaction first and then hand log embeds to
+# post(), which only queues them. One worker per log channel drains its queue,
+# packing as many pending embeds as fit into each message, and retries
+# transient failures with exponential backoff. A slow or failing log channel
+# never delays a command response.
+#
+# An entry may carry a file on disk (e.g. a purge transcript). Such entries are
+# sent as their own message, and the file is only opened when it is sent.
+
+class LogDispatcher:
+    def __init__(self):
+        self.queues = {}
+        self.channels = {}
+        self.workers = {}
+
+    def post(self, channel, embed, file_path=None, filename=None):
+        if channel is None:
+            return
+        self.queues.setdefault(channel.id, deque()).append((embed, file_path, filename))
+        self.channels[channel.id] = channel
+        worker = self.workers.get(channel.id)
+        if worker is None or worker.done():
+            self.workers[channel.id] = asyncio.get_running_loop().create_task(self._worker(channel.id))
+
+    async def flush(self):
+        for worker in list(self.workers.values()):
+            if not worker.done():
+                await asyncio.shield(worker)
+
+    async def _worker(self, channel_id):
+        queue = self.queues[channel_id]
+        await asyncio.sleep(BATCH_DELAY)
+        while queue:
+            embed, file_path, filename = queue.popleft()
+            if file_path:
+                await self._send(self.channels[channel_id], [embed], file_path, filename)
+                continue
+            batch = [embed]
+            size = len(embed)
+            while (
+                queue and not queue[0][1] and len(batch) < MAX_EMBEDS_PER_MESSAGE
+                and size + len(queue[0][0]) <= MAX_EMBED_CHARS_PER_MESSAGE
+            ):
+                size += len(queue[0][0])
+                batch.append(queue.popleft()[0])
+            await self._send(self.channels[channel_id], batch)
+
+    async def _send(self, channel, embeds, file_path=None, filename=None):
+        for attempt in range(MAX_RETRIES):
+            try:
+                if file_path:
+                    # A fresh File per attempt: a failed upload has consumed the last one.
+                    await channel.send(embeds=embeds, file=discord.File(file_path, filename=filename))
+                else:
+                    await channel.send(embeds=embeds)
+                return
+            except discord.HTTPException as e:
+                # Missing access, deleted channel, invalid embed: retrying won't help.
+                if e.status < 500:
+                    print(f"[ERROR] Failed to send {len(embeds)} log embed(s) to {channel}: {e}")
+                    return
+                error = e
+            except OSError as e:
+                error = e
+            delay = RETRY_BASE_DELAY * 2 ** attempt
+            print(f"[ERROR] Log channel {channel} send failed ({error}), retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+        print(f"[ERROR] Dropped {len(embeds)} log embed(s) for {channel} after {MAX_RETRIES} attempts")
+
+# Shared by every cog.
+log_dispatcher = LogDispatcher()
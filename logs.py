@@ -1,8 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, Interaction
-import json
-import os
+
+from .guild_settings import settings
 
 class Logs(commands.Cog):
     def __init__(self, bot):
@@ -34,17 +34,7 @@ class Logs(commands.Cog):
             )
             return
 
-        file_path = f"server_data/{interaction.guild.id}_settings.json"
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                data = json.load(f)
-        else:
-            data = {}
-
-        data[log_types[type]] = channel.id
-
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=4)
+        await settings.update(interaction.guild.id, log_types[type], channel.id)
 
         await interaction.response.send_message(
             f"✅ {type.capitalize()} log channel set to {channel.mention}.",
@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 import asyncio
 
+from cogs.io_pool import LoopLagMonitor
+
 TOKEN = "bot-token"  # Replace this with your real token
 
 # Set up intents and bot
@@ -41,6 +43,7 @@ async def load_extensions():
 # Main entry point for running the bot
 async def main():
     async with bot:
+        LoopLagMonitor().start()  # Logs how long the event loop is blocked
         await load_extensions()  # Load all cogs/extensions
         await bot.start(TOKEN)   # Start the bot with your token
 
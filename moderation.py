@@ -2,11 +2,17 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import utcnow
-from datetime import timedelta
-import json
+from datetime import datetime, timedelta, timezone
 import os
 import re
 
+from .bulk_executor import run_bulk
+from .guild_settings import settings
+from .log_dispatcher import log_dispatcher
+from .proof_archive import proof_archive
+from .scheduler import scheduler
+from .storage import db
+
 def parse_duration(duration_str):
     pattern = r'((?P<days>\d+)d)?((?P<hours>\d+)h)?((?P<minutes>\d+)m)?((?P<seconds>\d+)s)?'
     match = re.fullmatch(pattern, duration_str)
@@ -16,12 +22,10 @@ def parse_duration(duration_str):
     return timedelta(**time_params)
 
 def get_moderation_log_channel(guild: discord.Guild):
-    path = f"server_data/{guild.id}_settings.json"
-    if not os.path.exists(path):
-        return None
-    with open(path, "r") as f:
-        data = json.load(f)
-    return guild.get_channel(data.get("modlog_channel"))
+    return settings.get_channel(guild, "modlog_channel")
+
+def parse_user_ids(text):
+    return list(dict.fromkeys(int(uid) for uid in re.findall(r"\d{15,20}", text)))
 
 MUTE_REASONS = [
     app_commands.Choice(name='Spamming', value='spamming'),
@@ -39,6 +43,14 @@ BAN_REASONS = [
     app_commands.Choice(name='NSFW', value='nsfw'),
 ]
 
+# Most users a single bulk command (/unban user_ids, /massban, /massmute) acts on.
+MAX_BULK_TARGETS = 1000
+
+# Discord's upper limit for a native timeout. Longer mutes are re-applied by a
+# "mute_extend" job shortly before each 28-day step runs out.
+MAX_TIMEOUT = timedelta(days=28)
+MUTE_EXTEND_MARGIN = timedelta(hours=1)
+
 MUTE_DURATIONS = {
     'spamming': timedelta(minutes=15),
     'racism': timedelta(days=3),
@@ -47,28 +59,217 @@ MUTE_DURATIONS = {
     'advertising': timedelta(days=1),
 }
 
+CASE_ACTIONS = [
+    app_commands.Choice(name='Mute', value='mute'),
+    app_commands.Choice(name='Unmute', value='unmute'),
+    app_commands.Choice(name='Ban', value='ban'),
+    app_commands.Choice(name='Unban', value='unban'),
+]
+
+# Kept small so a page with long reasons and proof links fits in one embed.
+CASES_PAGE_SIZE = 8
+CASE_REASON_PREVIEW = 120
+
+class CasesView(discord.ui.View):
+    def __init__(self, user: discord.User, filters: dict):
+        super().__init__(timeout=180)
+        self.user = user
+        self.filters = filters
+        # cursors[i] is the before_case bound of page i; None for the newest page.
+        self.cursors = [None]
+        self.page = 0
+        self.has_next = False
+
+    async def build_embed(self):
+        cases = await db.mod_cases(before_case=self.cursors[self.page], limit=CASES_PAGE_SIZE + 1, **self.filters)
+        self.has_next = len(cases) > CASES_PAGE_SIZE
+        cases = cases[:CASES_PAGE_SIZE]
+        if self.has_next and len(self.cursors) == self.page + 1:
+            self.cursors.append(cases[-1]["case_id"])
+
+        description = ""
+        for case in cases:
+            description += (
+                f"**#{case['case_id']}** `{case['action']}` <@{case['user_id']}> by <@{case['moderator_id']}> "
+                f"<t:{case['created_at']}:R>"
+            )
+            if case["duration"]:
+                description += f" • {timedelta(seconds=case['duration'])}"
+            description += f"\n> {(case['reason'] or 'No reason given')[:CASE_REASON_PREVIEW]}"
+            if case["proof_sha256"]:
+                description += f" • proof: `/proof {case['case_id']}`"
+            elif case["proof_url"]:
+                description += f" • [proof]({case['proof_url']})"
+            description += "\n"
+
+        embed = discord.Embed(
+            title="📁 Moderation Cases",
+            description=description or "No cases match these filters.",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text=f"Page {self.page + 1}")
+
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = not self.has_next
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user.id:
+            await interaction.response.send_message("Run /cases to browse them yourself.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=await self.build_embed(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.has_next:
+            self.page += 1
+        await interaction.response.edit_message(embed=await self.build_embed(), view=self)
+
+class ConfirmView(discord.ui.View):
+    def __init__(self, user: discord.User):
+        super().__init__(timeout=60)
+        self.user = user
+        self.confirmed = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user.id
+
+    @discord.ui.button(label="Confirm", style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = True
+        await interaction.response.edit_message(content="⏳ Starting…", view=None)
+        self.stop()
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = False
+        await interaction.response.edit_message(content="Cancelled.", view=None)
+        self.stop()
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def send_log(self, interaction, title, user, reason, proof=None):
-        channel = get_moderation_log_channel(interaction.guild)
+    async def cog_load(self):
+        self.bot.loop.create_task(self.start_jobs())
+
+    async def start_jobs(self):
+        await self.bot.wait_until_ready()
+        scheduler.register("tempban_end", self.on_tempban_end)
+        scheduler.register("mute_extend", self.on_mute_extend)
+        await scheduler.start()
+
+    async def cog_unload(self):
+        scheduler.unregister("tempban_end")
+        scheduler.unregister("mute_extend")
+        await log_dispatcher.flush()
+        await proof_archive.close()
+
+    # Queues the entry; call it after the interaction has been answered.
+    def send_log(self, interaction, title, user, reason, proof=None, case_id=None, duration=None):
+        self.post_log(interaction.guild, interaction.user, title, user, reason, proof, case_id, duration)
+
+    def post_log(self, guild, moderator, title, user, reason, proof=None, case_id=None, duration=None):
+        channel = get_moderation_log_channel(guild)
         if not channel:
             return
         embed = discord.Embed(title=title, color=discord.Color.red())
-        embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else discord.Embed.Empty)
-        embed.add_field(name="User", value=f"{user.mention} ({user.id})", inline=False)
-        embed.add_field(name="Moderator", value=interaction.user.mention, inline=False)
+        if case_id:
+            embed.set_footer(text=f"Case #{case_id}")
+        embed.set_thumbnail(url=guild.icon.url if guild.icon else discord.Embed.Empty)
+        embed.add_field(name="User", value=f"<@{user.id}> ({user.id})", inline=False)
+        embed.add_field(name="Moderator", value=moderator.mention, inline=False)
         embed.add_field(name="Reason", value=reason, inline=False)
+        if duration:
+            embed.add_field(name="Duration", value=str(duration), inline=False)
         if proof:
             embed.set_image(url=proof.url)
-        await channel.send(embed=embed)
+            if case_id:
+                embed.add_field(name="Proof", value=f"Archived — `/proof {case_id}`", inline=False)
+        log_dispatcher.post(channel, embed)
+
+    async def record_case(self, interaction, action, user, reason, proof=None, duration=None):
+        case_id = await db.add_mod_case(
+            interaction.guild.id, action, user.id, interaction.user.id, reason,
+            proof.url if proof else None, int(duration.total_seconds()) if duration else None
+        )
+        if proof:
+            self.bot.loop.create_task(self.archive_proof(interaction.guild.id, case_id, proof))
+        return case_id
+
+    async def archive_proof(self, guild_id, case_id, proof):
+        sha256 = await proof_archive.archive(proof.url, proof.filename, proof.content_type)
+        if sha256:
+            await db.set_case_proof(guild_id, case_id, sha256)
+
+    # ─── Timed actions ─────────────────────────────────────────────────────────
+
+    async def apply_timeout(self, member, until, reason):
+        step = min(until, utcnow() + MAX_TIMEOUT)
+        await member.edit(timed_out_until=step, reason=reason)
+        key = f"{member.guild.id}:{member.id}"
+        if until > step:
+            await scheduler.schedule(
+                "mute_extend", key, step - MUTE_EXTEND_MARGIN, {"until": until.timestamp(), "reason": reason}
+            )
+        elif scheduler.has("mute_extend", key):
+            await scheduler.cancel("mute_extend", key)
+
+    # Errors propagate on purpose: the scheduler retries a failed job with
+    # backoff and only forgets it once its handler has succeeded.
+    async def on_mute_extend(self, key, payload):
+        guild_id, user_id = map(int, key.split(":"))
+        guild = self.bot.get_guild(guild_id)
+        member = guild and guild.get_member(user_id)
+        until = datetime.fromtimestamp(payload["until"], timezone.utc)
+        if until <= utcnow():
+            return
+        if not member:
+            # Keep the mute until it ends; on_member_join re-applies it.
+            await scheduler.schedule("mute_extend", key, until, payload)
+            return
+        await self.apply_timeout(member, until, payload["reason"])
+
+    async def on_tempban_end(self, key, payload):
+        guild_id, user_id = map(int, key.split(":"))
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        reason = "Temporary ban expired"
+        try:
+            await guild.unban(discord.Object(id=user_id), reason=reason)
+        except discord.NotFound:
+            return
+        case_id = await db.add_mod_case(guild_id, "unban", user_id, self.bot.user.id, reason)
+        self.post_log(guild, self.bot.user, "♻️ Member Unbanned", discord.Object(id=user_id), reason, case_id=case_id)
+
+    # ─── Commands ──────────────────────────────────────────────────────────────
 
     @app_commands.command(name="mute", description="Mute a specific member")
-    @app_commands.describe(member='Member to mute', reason='Reason for mute', proof='Proof attachment')
+    @app_commands.describe(
+        member='Member to mute',
+        reason='Reason for mute',
+        proof='Proof attachment',
+        duration="Override the reason's default length, e.g. 2h or 60d"
+    )
     @app_commands.choices(reason=MUTE_REASONS)
-    async def mute(self, interaction: discord.Interaction, member: discord.Member, reason: app_commands.Choice[str], proof: discord.Attachment):
-        duration = MUTE_DURATIONS.get(reason.value)
+    async def mute(self, interaction: discord.Interaction, member: discord.Member, reason: app_commands.Choice[str], proof: discord.Attachment, duration: str = None):
+        if duration is not None:
+            try:
+                duration = parse_duration(duration)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+            if duration <= timedelta(0):
+                await interaction.response.send_message("❌ The duration must be longer than zero.", ephemeral=True)
+                return
+        else:
+            duration = MUTE_DURATIONS.get(reason.value)
         if not duration:
             await interaction.response.send_message("No duration configured for this reason.", ephemeral=True)
             return
@@ -86,18 +287,34 @@ class Moderation(commands.Cog):
             return
 
         try:
-            await member.edit(timed_out_until=utcnow() + duration, reason=reason.name)
+            await self.apply_timeout(member, utcnow() + duration, reason.name)
         except Exception as e:
             await interaction.response.send_message(f"Failed to mute member: {e}", ephemeral=True)
             return
 
-        await self.send_log(interaction, "🔇 Member Timed Out", member, reason.name, proof)
         await interaction.response.send_message(f"✅ {member.mention} has been muted for {str(duration)} due to **{reason.name}**.", ephemeral=True)
+        case_id = await self.record_case(interaction, "mute", member, reason.name, proof, duration)
+        self.send_log(interaction, "🔇 Member Timed Out", member, reason.name, proof, case_id, duration)
 
     @app_commands.command(name="ban", description="Ban a specific user")
-    @app_commands.describe(user='User to ban', reason='Reason for ban', proof='Proof attachment')
+    @app_commands.describe(
+        user='User to ban',
+        reason='Reason for ban',
+        proof='Proof attachment',
+        duration='(Optional) Lift the ban automatically after this long, e.g. 7d'
+    )
     @app_commands.choices(reason=BAN_REASONS)
-    async def ban(self, interaction: discord.Interaction, user: discord.User, reason: app_commands.Choice[str], proof: discord.Attachment):
+    async def ban(self, interaction: discord.Interaction, user: discord.User, reason: app_commands.Choice[str], proof: discord.Attachment, duration: str = None):
+        if duration is not None:
+            try:
+                duration = parse_duration(duration)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+            if duration <= timedelta(0):
+                await interaction.response.send_message("❌ The duration must be longer than zero.", ephemeral=True)
+                return
+
         member = interaction.guild.get_member(user.id)
         if member:
             if member.top_role > interaction.user.top_role:
@@ -118,8 +335,16 @@ class Moderation(commands.Cog):
             await interaction.response.send_message(f"Failed to ban user: {e}", ephemeral=True)
             return
 
-        await self.send_log(interaction, "🔨 Member Banned", user, reason.name, proof)
-        await interaction.response.send_message(f"✅ {user.mention} has been banned for **{reason.name}**.", ephemeral=True)
+        length = f" for {duration}" if duration is not None else ""
+        await interaction.response.send_message(f"✅ {user.mention} has been banned{length} for **{reason.name}**.", ephemeral=True)
+        key = f"{interaction.guild.id}:{user.id}"
+        if duration is not None:
+            await scheduler.schedule("tempban_end", key, utcnow() + duration)
+        elif scheduler.has("tempban_end", key):
+            # A permanent ban replaces an earlier temporary one.
+            await scheduler.cancel("tempban_end", key)
+        case_id = await self.record_case(interaction, "ban", user, reason.name, proof, duration)
+        self.send_log(interaction, "🔨 Member Banned", user, reason.name, proof, case_id, duration)
 
     @app_commands.command(name="unmute", description="Unmute a member currently muted")
     @app_commands.describe(member="Member to unmute", reason="Reason for unmute")
@@ -145,26 +370,338 @@ class Moderation(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"Failed to unmute member: {e}", ephemeral=True)
             return
+        if scheduler.has("mute_extend", f"{interaction.guild.id}:{member.id}"):
+            await scheduler.cancel("mute_extend", f"{interaction.guild.id}:{member.id}")
 
-        await self.send_log(interaction, "🔊 Member Unmuted", member, reason)
         await interaction.response.send_message(f"✅ {member.mention} has been unmuted.", ephemeral=True)
+        case_id = await self.record_case(interaction, "unmute", member, reason)
+        self.send_log(interaction, "🔊 Member Unmuted", member, reason, case_id=case_id)
+
+    @app_commands.command(name="unban", description="Unban a user, or several users by ID")
+    @app_commands.describe(
+        reason="Reason for unban",
+        user="User to unban",
+        user_ids="Bulk mode: user IDs separated by spaces, commas or new lines"
+    )
+    async def unban(self, interaction: discord.Interaction, reason: str, user: discord.User = None, user_ids: str = None):
+        if user_ids:
+            await self.bulk_unban(interaction, reason, user_ids)
+            return
+        if not user:
+            await interaction.response.send_message("Pick a user, or pass `user_ids` to unban several.", ephemeral=True)
+            return
 
-    @app_commands.command(name="unban", description="Unban a user")
-    @app_commands.describe(user="User to unban", reason="Reason for unban")
-    async def unban(self, interaction: discord.Interaction, user: discord.User, reason: str):
+        guild = interaction.guild
         try:
-            bans = await interaction.guild.bans()
-            if discord.utils.find(lambda b: b.user.id == user.id, bans):
-                await interaction.guild.unban(user, reason=reason)
-            else:
-                await interaction.response.send_message("❌ This user is not banned.", ephemeral=True)
-                return
+            # Discord answers NotFound for a user who isn't banned.
+            await guild.unban(user, reason=reason)
+        except discord.NotFound:
+            await interaction.response.send_message("❌ This user is not banned.", ephemeral=True)
+            return
         except Exception as e:
             await interaction.response.send_message(f"Failed to unban user: {e}", ephemeral=True)
             return
 
-        await self.send_log(interaction, "♻️ Member Unbanned", user, reason)
         await interaction.response.send_message(f"✅ {user.mention} has been unbanned.", ephemeral=True)
+        case_id = await self.record_case(interaction, "unban", user, reason)
+        self.send_log(interaction, "♻️ Member Unbanned", user, reason, case_id=case_id)
+
+    async def bulk_unban(self, interaction: discord.Interaction, reason: str, user_ids: str):
+        if not interaction.user.guild_permissions.ban_members:
+            await interaction.response.send_message("❌ Bulk unbans need the Ban Members permission.", ephemeral=True)
+            return
+        ids = parse_user_ids(user_ids)
+        if not ids:
+            await interaction.response.send_message("❌ No user IDs found.", ephemeral=True)
+            return
+        if len(ids) > MAX_BULK_TARGETS:
+            await interaction.response.send_message(f"❌ At most {MAX_BULK_TARGETS} IDs per run.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild
+
+        async def unban_one(user_id):
+            try:
+                await guild.unban(discord.Object(id=user_id), reason=reason)
+            except discord.NotFound:
+                return False
+
+        result = await run_bulk(ids, unban_one)
+
+        summary = f"✅ Unbanned **{len(result.done)}** user(s)."
+        if result.skipped:
+            summary += f"\n• {len(result.skipped)} were not banned."
+        if result.failed:
+            summary += f"\n• {len(result.failed)} failed: " + ", ".join(str(uid) for uid in result.failed[:20])
+        await interaction.followup.send(summary, ephemeral=True)
+
+        await self.send_bulk_log(interaction, "unban", "♻️ Members Unbanned", result.done, reason)
+
+    # One case per user, but a single modlog embed for the whole run.
+    async def send_bulk_log(self, interaction, action, title, user_ids, reason, duration=None):
+        if not user_ids:
+            return
+        cases = await db.add_mod_cases(
+            interaction.guild.id, action, user_ids, interaction.user.id, reason,
+            int(duration.total_seconds()) if duration else None
+        )
+        channel = get_moderation_log_channel(interaction.guild)
+        if not channel:
+            return
+        description = " ".join(f"<@{uid}>" for uid in user_ids)
+        if len(description) > 4000:
+            # Cut between two mentions, never through one.
+            description = description[:description.rfind(" ", 0, 3950)]
+            description += f" … and {len(user_ids) - description.count('<@')} more"
+        embed = discord.Embed(
+            title=title,
+            description=description,
+            color=discord.Color.red()
+        )
+        embed.add_field(name="Count", value=str(len(user_ids)), inline=False)
+        embed.add_field(name="Moderator", value=interaction.user.mention, inline=False)
+        embed.add_field(name="Reason", value=reason, inline=False)
+        if duration:
+            embed.add_field(name="Duration", value=str(duration), inline=False)
+        embed.set_footer(text=f"Cases #{cases[0]}–#{cases[-1]}" if len(cases) > 1 else f"Case #{cases[0]}")
+        log_dispatcher.post(channel, embed)
+
+    # ─── Mass actions ──────────────────────────────────────────────────────────
+
+    def can_moderate(self, interaction, target):
+        if target.id in (interaction.user.id, interaction.guild.owner_id, self.bot.user.id):
+            return False
+        if isinstance(target, discord.Member):
+            # Same rules as /mute and /ban.
+            if target.top_role > interaction.user.top_role:
+                return False
+            if target.top_role >= interaction.guild.me.top_role:
+                return False
+        return True
+
+    def select_targets(self, interaction, user_ids, joined_within, account_younger_than):
+        guild = interaction.guild
+        if user_ids:
+            candidates = [guild.get_member(uid) or discord.Object(id=uid) for uid in parse_user_ids(user_ids)]
+        elif joined_within:
+            candidates = list(guild.members)
+        else:
+            raise ValueError("Give `user_ids`, `joined_within` or both.")
+
+        # Filters combine: with user_ids, joined_within narrows the given IDs to
+        # members who joined recently.
+        if joined_within:
+            joined_after = utcnow() - parse_duration(joined_within)
+            candidates = [
+                c for c in candidates
+                if getattr(c, "joined_at", None) and c.joined_at >= joined_after
+            ]
+
+        if account_younger_than:
+            created_after = utcnow() - parse_duration(account_younger_than)
+            candidates = [c for c in candidates if discord.utils.snowflake_time(c.id) >= created_after]
+
+        targets = [c for c in candidates if self.can_moderate(interaction, c)]
+        if len(targets) > MAX_BULK_TARGETS:
+            raise ValueError(f"That matches {len(targets)} users; at most {MAX_BULK_TARGETS} per run.")
+        return targets, len(candidates) - len(targets)
+
+    async def run_mass_action(self, interaction, verb, targets, protected, action):
+        if not targets:
+            await interaction.response.send_message(f"❌ Nobody to {verb}.", ephemeral=True)
+            return None
+
+        view = ConfirmView(interaction.user)
+        prompt = f"⚠️ This will {verb} **{len(targets)}** user(s)."
+        if protected:
+            prompt += f" {protected} more are protected by role hierarchy and will be skipped."
+        await interaction.response.send_message(prompt + " Continue?", view=view, ephemeral=True)
+        await view.wait()
+        if not view.confirmed:
+            if view.confirmed is None:
+                await interaction.edit_original_response(content="Timed out.", view=None)
+            return None
+
+        async def progress(result):
+            await interaction.edit_original_response(
+                content=f"⏳ {verb.capitalize()}: {result.finished}/{result.total} "
+                        f"({len(result.failed)} failed)"
+            )
+
+        return await run_bulk(targets, action, progress)
+
+    @app_commands.command(name="massban", description="Ban many users at once, by ID or by join time")
+    @app_commands.describe(
+        reason="Reason for the bans",
+        user_ids="User IDs separated by spaces, commas or new lines",
+        joined_within="Everyone who joined within this time, e.g. 10m",
+        account_younger_than="Only accounts younger than this, e.g. 7d"
+    )
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def massban(
+        self,
+        interaction: discord.Interaction,
+        reason: str,
+        user_ids: str = None,
+        joined_within: str = None,
+        account_younger_than: str = None
+    ):
+        try:
+            targets, protected = self.select_targets(interaction, user_ids, joined_within, account_younger_than)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+
+        async def ban_one(target):
+            await interaction.guild.ban(target, reason=reason)
+
+        result = await self.run_mass_action(interaction, "ban", targets, protected, ban_one)
+        if result is None:
+            return
+
+        summary = f"✅ Banned **{len(result.done)}**/{result.total} user(s)."
+        if result.failed:
+            summary += f"\n• {len(result.failed)} failed: " + ", ".join(str(t.id) for t in result.failed[:20])
+        await interaction.edit_original_response(content=summary)
+
+        await self.send_bulk_log(interaction, "ban", "🔨 Members Banned", [t.id for t in result.done], reason)
+
+    @app_commands.command(name="massmute", description="Time out many members at once, by ID or by join time")
+    @app_commands.describe(
+        duration="How long, e.g. 1h or 7d",
+        reason="Reason for the mutes",
+        user_ids="User IDs separated by spaces, commas or new lines",
+        joined_within="Everyone who joined within this time, e.g. 10m",
+        account_younger_than="Only accounts younger than this, e.g. 7d"
+    )
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def massmute(
+        self,
+        interaction: discord.Interaction,
+        duration: str,
+        reason: str,
+        user_ids: str = None,
+        joined_within: str = None,
+        account_younger_than: str = None
+    ):
+        try:
+            length = parse_duration(duration)
+            if length <= timedelta(0):
+                raise ValueError("Duration must be at least 1s.")
+            targets, protected = self.select_targets(interaction, user_ids, joined_within, account_younger_than)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+
+        # Only current members can be timed out.
+        absent = sum(1 for t in targets if not isinstance(t, discord.Member))
+        targets = [t for t in targets if isinstance(t, discord.Member)]
+
+        async def mute_one(member):
+            await self.apply_timeout(member, utcnow() + length, reason)
+
+        result = await self.run_mass_action(interaction, "mute", targets, protected, mute_one)
+        if result is None:
+            return
+
+        summary = f"✅ Muted **{len(result.done)}**/{result.total} member(s) for {length}."
+        if absent:
+            summary += f"\n• {absent} ID(s) are not in the server."
+        if result.failed:
+            summary += f"\n• {len(result.failed)} failed: " + ", ".join(str(t.id) for t in result.failed[:20])
+        await interaction.edit_original_response(content=summary)
+
+        await self.send_bulk_log(
+            interaction, "mute", "🔇 Members Timed Out", [t.id for t in result.done], reason, length
+        )
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        # A long mute outlives leaving and rejoining.
+        key = f"{member.guild.id}:{member.id}"
+        payload = scheduler.payload("mute_extend", key)
+        if not payload:
+            return
+        until = datetime.fromtimestamp(payload["until"], timezone.utc)
+        if until <= utcnow():
+            return
+        try:
+            await self.apply_timeout(member, until, payload["reason"])
+        except discord.HTTPException as e:
+            print(f"[ERROR] Failed to re-apply mute for {member} on rejoin, retrying: {e}")
+            await scheduler.schedule("mute_extend", key, utcnow(), payload)
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        # However the ban was lifted, a pending temp-ban expiry is now moot.
+        key = f"{guild.id}:{user.id}"
+        if scheduler.has("tempban_end", key):
+            await scheduler.cancel("tempban_end", key)
+
+    @app_commands.command(name="proof", description="Show the archived proof of a moderation case")
+    @app_commands.describe(case_id="Case number")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def proof(self, interaction: discord.Interaction, case_id: int):
+        case = await db.get_mod_case(interaction.guild.id, case_id)
+        if not case:
+            await interaction.response.send_message(f"❌ There is no case #{case_id}.", ephemeral=True)
+            return
+        if not case["proof_sha256"]:
+            message = "❌ This case has no archived proof."
+            if case["proof_url"]:
+                message += f" It may still be downloading; original: {case['proof_url']}"
+            await interaction.response.send_message(message, ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        info = await db.get_proof_file(case["proof_sha256"])
+        path = proof_archive.path(case["proof_sha256"])
+        if not info or not os.path.exists(path):
+            await interaction.followup.send("❌ The archived file is missing from disk.", ephemeral=True)
+            return
+        if info["size"] > interaction.guild.filesize_limit:
+            await interaction.followup.send(
+                f"📁 Proof for case #{case_id} is too large to upload here ({info['size'] // 1024 // 1024} MB). "
+                f"Archived as `{case['proof_sha256']}`.",
+                ephemeral=True
+            )
+            return
+        await interaction.followup.send(
+            f"📁 Proof for case #{case_id}",
+            file=discord.File(path, filename=info["filename"] or case["proof_sha256"]),
+            ephemeral=True
+        )
+
+    @app_commands.command(name="cases", description="Browse moderation cases")
+    @app_commands.describe(
+        user="Only cases against this user",
+        moderator="Only cases handled by this moderator",
+        action="Only this kind of action",
+        days="Only cases from the last N days"
+    )
+    @app_commands.choices(action=CASE_ACTIONS)
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def cases(
+        self,
+        interaction: discord.Interaction,
+        user: discord.User = None,
+        moderator: discord.Member = None,
+        action: app_commands.Choice[str] = None,
+        days: app_commands.Range[int, 1, 3650] = None
+    ):
+        filters = {"guild_id": interaction.guild.id}
+        if user:
+            filters["user_id"] = user.id
+        if moderator:
+            filters["moderator_id"] = moderator.id
+        if action:
+            filters["action"] = action.value
+        if days:
+            filters["since"] = (utcnow() - timedelta(days=days)).timestamp()
+
+        view = CasesView(interaction.user, filters)
+        await interaction.response.send_message(embed=await view.build_embed(), view=view, ephemeral=True)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
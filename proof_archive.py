@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+import aiohttp
+
+from .io_pool import run_io
+from .storage import db
+
+ARCHIVE_DIR = os.path.join("server_data", "proofs")
+
+# Downloads (and pooled connections) at once, and the largest file kept.
+DOWNLOAD_CONCURRENCY = 3
+MAX_PROOF_BYTES = 200 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# ─── Proof Archive ─────────────────────────────────────────────────────────────
+#
+# Discord attachment URLs expire, so moderation proof is copied to local disk.
+# Files are stored under their SHA-256: the same screenshot attached to twenty
+# cases is kept once. Downloads stream in CHUNK_SIZE pieces straight into a
+# temporary file (hashing as they go), so memory stays flat for large videos,
+# and run in the background so no command ever waits for one.
+
+class ProofArchive:
+    def __init__(self, root=ARCHIVE_DIR, concurrency=DOWNLOAD_CONCURRENCY):
+        self.root = root
+        self.concurrency = concurrency
+        self.session = None
+        self.semaphore = None
+        self.inflight = {}
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    async def archive(self, url, filename=None, content_type=None):
+        task = self.inflight.get(url)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._archive(url, filename, content_type))
+            self.inflight[url] = task
+        return await asyncio.shield(task)
+
+    async def _archive(self, url, filename, content_type):
+        if self.session is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=60)
+            )
+        try:
+            async with self.semaphore:
+                return await self._download(url, filename, content_type)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            print(f"[ERROR] Failed to archive proof {url}: {e}")
+            return None
+        finally:
+            self.inflight.pop(url, None)
+
+    async def _download(self, url, filename, content_type):
+        await run_io(os.makedirs, self.root, exist_ok=True)
+        fd, tmp_path = await run_io(tempfile.mkstemp, dir=self.root, suffix=".part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async with self.session.get(url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_PROOF_BYTES:
+                            print(f"[ERROR] Proof {url} is larger than {MAX_PROOF_BYTES} bytes; not archived")
+                            return None
+                        digest.update(chunk)
+                        await run_io(tmp.write, chunk)
+
+            sha256 = digest.hexdigest()
+            await run_io(self._store, tmp_path, sha256)
+            tmp_path = None
+            await db.add_proof_file(sha256, size, filename, content_type)
+            return sha256
+        finally:
+            if tmp_path:
+                await run_io(_remove, tmp_path)
+
+    def _store(self, tmp_path, sha256):
+        path = self.path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# Shared by every cog.
+proof_archive = ProofArchive()
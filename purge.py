@@ -2,81 +2,363 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timedelta
+import asyncio
+import gzip
 import json
 import os
+import re
+
+from .guild_settings import settings
+from .io_pool import run_io
+from .log_dispatcher import log_dispatcher
+
+MAX_PURGE = 10000
+
+# Messages scanned per run at most, so a filter that rarely matches can't walk
+# an entire channel's history.
+MAX_SCAN = 50000
+
+# Discord only bulk-deletes messages younger than 14 days; keep a margin so a
+# message doesn't age out between being fetched and being deleted.
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_SIZE = 100
+
+# Older messages are deleted one by one on a much stricter rate limit.
+SINGLE_DELETE_INTERVAL = 1.0
+SINGLE_DELETE_QUEUE = 500
+
+PROGRESS_INTERVAL = 2.0
+
+TRANSCRIPT_DIR = os.path.join("server_data", "transcripts")
+
+LINK_PATTERN = re.compile(r"https?://", re.IGNORECASE)
+
+# ─── Purge Engine ──────────────────────────────────────────────────────────────
+#
+# Walks channel history lazily, newest first, and deletes as it goes: matches
+# younger than 14 days are bulk-deleted 100 at a time, older ones are handed to
+# a single rate-limited worker. Only the current bulk chunk and a bounded queue
+# of old messages are ever held in memory.
+
+# ─── Purge Transcripts ─────────────────────────────────────────────────────────
+#
+# Every deleted message is appended to a gzip-compressed JSONL file as soon as
+# its delete succeeds, one chunk at a time. Compression and disk writes run on
+# the I/O pool; the lock keeps the bulk path and the single-delete worker from
+# writing into the gzip stream at the same time.
+
+class PurgeTranscript:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def _open(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return gzip.open(path, "wt", encoding="utf-8")
+
+    @staticmethod
+    def _record(message):
+        return json.dumps({
+            "id": message.id,
+            "author_id": message.author.id,
+            "author": str(message.author),
+            "content": message.content,
+            "attachments": [attachment.url for attachment in message.attachments],
+            "created_at": message.created_at.isoformat(),
+        }, ensure_ascii=False)
+
+    async def write(self, messages):
+        text = "".join(self._record(message) + "\n" for message in messages)
+        async with self.lock:
+            if self.file is None:
+                self.file = await run_io(self._open, self.path)
+            await run_io(self.file.write, text)
+            self.count += len(messages)
+
+    async def close(self):
+        async with self.lock:
+            if self.file is not None:
+                await run_io(self.file.close)
+                self.file = None
+
+    def size(self):
+        return os.path.getsize(self.path) if self.count else 0
+
+
+class PurgeRun:
+    def __init__(self, channel, amount, check, transcript=None):
+        self.channel = channel
+        self.amount = amount
+        self.check = check
+        self.transcript = transcript
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.old_queue = asyncio.Queue(maxsize=SINGLE_DELETE_QUEUE)
+
+    async def run(self, before, after):
+        worker = asyncio.get_running_loop().create_task(self._single_delete_worker())
+        chunk = []
+        bulk_cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        try:
+            async for message in self.channel.history(limit=MAX_SCAN, before=before, after=after, oldest_first=False):
+                self.scanned += 1
+                if not self.check(message):
+                    continue
+                self.matched += 1
+                if message.created_at > bulk_cutoff:
+                    chunk.append(message)
+                    if len(chunk) == BULK_DELETE_SIZE:
+                        await self._bulk_delete(chunk)
+                        chunk = []
+                else:
+                    # History is newest first: from here on everything is old.
+                    await self._queue_old(message, worker)
+                if self.matched >= self.amount:
+                    break
+            if chunk:
+                await self._bulk_delete(chunk)
+            await self._queue_old(None, worker)
+            await worker
+        finally:
+            worker.cancel()
+
+    # Waits for room in the queue, but never on a worker that has died.
+    async def _queue_old(self, message, worker):
+        if not worker.done():
+            if not self.old_queue.full():
+                self.old_queue.put_nowait(message)
+                return
+            put = asyncio.ensure_future(self.old_queue.put(message))
+            try:
+                await asyncio.wait((put, worker), return_when=asyncio.FIRST_COMPLETED)
+                if put.done():
+                    return
+            finally:
+                put.cancel()
+        worker.result()
+        raise RuntimeError("the old-message delete worker stopped")
+
+    async def _bulk_delete(self, messages):
+        try:
+            await self.channel.delete_messages(messages)
+            self.deleted += len(messages)
+        except discord.HTTPException as e:
+            print(f"[ERROR] Bulk delete of {len(messages)} messages failed: {e}")
+            self.failed += len(messages)
+            return
+        if self.transcript:
+            await self.transcript.write(messages)
+
+    async def _single_delete_worker(self):
+        while True:
+            message = await self.old_queue.get()
+            if message is None:
+                return
+            try:
+                await message.delete()
+                self.deleted += 1
+                if self.transcript:
+                    await self.transcript.write([message])
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                print(f"[ERROR] Failed to delete message {message.id}: {e}")
+                self.failed += 1
+            except Exception as e:
+                print(f"[ERROR] Error while deleting message {message.id}: {e}")
+                self.failed += 1
+            await asyncio.sleep(SINGLE_DELETE_INTERVAL)
+
+
+def build_check(user, bots_only, pattern, attachments_only, links_only):
+    def check(message: discord.Message):
+        if user and message.author.id != user.id:
+            return False
+        if bots_only and not message.author.bot:
+            return False
+        if attachments_only and not message.attachments:
+            return False
+        if links_only and not LINK_PATTERN.search(message.content):
+            return False
+        if pattern and not pattern.search(message.content):
+            return False
+        return True
+    return check
+
+
+def parse_message_id(value):
+    # Accepts a raw ID or a message link.
+    match = re.search(r"(\d{15,20})\s*$", value or "")
+    return discord.Object(id=int(match.group(1))) if match else None
+
 
 class Purge(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_unload(self):
+        await log_dispatcher.flush()
+
     async def get_moderation_log_channel(self, guild: discord.Guild):
-        path = f"server_data/{guild.id}_settings.json"
-        if not os.path.exists(path):
-            return None
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-                log_channel_id = data.get("modlog_channel")
-                if log_channel_id:
-                    return guild.get_channel(log_channel_id)
-        except Exception as e:
-            print(f"[ERROR] Failed to load moderation log channel: {e}")
-        return None
+        return settings.get_channel(guild, "modlog_channel")
 
-    @app_commands.command(name="purge", description="Delete a number of messages from the channel.")
-    @app_commands.describe(amount="Number of messages to delete (max 100)")
-    async def purge(self, interaction: discord.Interaction, amount: int):
+    @app_commands.command(name="purge", description="Delete messages from the channel, optionally filtered.")
+    @app_commands.describe(
+        amount=f"Number of messages to delete (max {MAX_PURGE})",
+        user="Only messages from this user",
+        bots_only="Only messages from bots",
+        regex="Only messages whose content matches this regular expression",
+        attachments_only="Only messages with attachments",
+        links_only="Only messages containing links",
+        before="Only messages before this message (ID or link)",
+        after="Only messages after this message (ID or link)"
+    )
+    async def purge(
+        self,
+        interaction: discord.Interaction,
+        amount: int,
+        user: discord.User = None,
+        bots_only: bool = False,
+        regex: str = None,
+        attachments_only: bool = False,
+        links_only: bool = False,
+        before: str = None,
+        after: str = None
+    ):
         print(f"[DEBUG] /purge command invoked with amount {amount} by {interaction.user}")
 
         if not interaction.user.guild_permissions.manage_messages:
             await interaction.response.send_message(":x: You don't have permission to manage messages.", ephemeral=True)
             return
 
-        if amount < 1 or amount > 100:
-            await interaction.response.send_message("⚠ You can only purge between 1 and 100 messages.", ephemeral=True)
+        if amount < 1 or amount > MAX_PURGE:
+            await interaction.response.send_message(f"⚠ You can only purge between 1 and {MAX_PURGE} messages.", ephemeral=True)
             return
 
-        await interaction.response.defer(thinking=True)
+        try:
+            pattern = re.compile(regex, re.IGNORECASE) if regex else None
+        except re.error as e:
+            await interaction.response.send_message(f":x: Invalid regex: {e}", ephemeral=True)
+            return
 
+        before_obj = parse_message_id(before)
+        after_obj = parse_message_id(after)
+        if (before and not before_obj) or (after and not after_obj):
+            await interaction.response.send_message(":x: `before`/`after` must be a message ID or link.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        # Never touch anything posted after the command itself.
         cutoff = interaction.created_at - timedelta(seconds=1)
+        if not before_obj or discord.utils.snowflake_time(before_obj.id) > cutoff:
+            before_obj = cutoff
 
-        def is_eligible(msg: discord.Message):
-            return msg.created_at < cutoff
+        transcript = PurgeTranscript(os.path.join(
+            TRANSCRIPT_DIR, str(interaction.guild.id), f"{interaction.channel.id}-{interaction.id}.jsonl.gz"
+        ))
+        run = PurgeRun(
+            interaction.channel, amount,
+            build_check(user, bots_only, pattern, attachments_only, links_only),
+            transcript
+        )
 
+        # Old messages delete slowly; a long run can outlive the 15-minute
+        # interaction token, after which edits simply stop.
+        async def respond(**kwargs):
+            try:
+                await interaction.edit_original_response(**kwargs)
+            except discord.HTTPException:
+                pass
+
+        async def report():
+            while True:
+                await asyncio.sleep(PROGRESS_INTERVAL)
+                await respond(content=f"🧹 Purging… {run.deleted}/{amount} deleted ({run.scanned} scanned)")
+
+        ticker = self.bot.loop.create_task(report())
+        error = None
+        embed = None
         try:
-            purged = await interaction.channel.purge(limit=amount + 1, check=is_eligible)
-            purged = purged[:amount]
+            await run.run(before_obj, after_obj)
         except Exception as e:
             print(f"[ERROR] Error while purging messages: {e}")
-            await interaction.followup.send(":x: Failed to purge messages.", ephemeral=True)
-            return
+            error = e
+        finally:
+            # Runs even if the purge fails or is cancelled partway, so whatever
+            # was deleted is always logged along with its transcript.
+            ticker.cancel()
+            try:
+                await transcript.close()
+            except OSError as e:
+                print(f"[ERROR] Failed to finish purge transcript {transcript.path}: {e}")
+            if run.deleted or error:
+                embed = self.purge_embed(interaction, run, error, [
+                    label for label, active in (
+                        (f"user {user.mention}" if user else "", user),
+                        ("bots only", bots_only),
+                        (f"regex `{regex}`", regex),
+                        ("attachments", attachments_only),
+                        ("links", links_only),
+                        (f"before {before}", before),
+                        (f"after {after}", after),
+                    ) if active
+                ])
+                await self.log_purge(interaction.guild, embed, transcript)
 
-        if not purged:
-            await interaction.followup.send(":x: No messages found to purge.", ephemeral=True)
-            return
+        if not embed:
+            await respond(content=":x: No messages found to purge.")
+        elif error:
+            await respond(content=f":x: Purge stopped after {run.deleted} message(s).", embed=embed)
+        else:
+            await respond(content=None, embed=embed)
 
+    def purge_embed(self, interaction, run, error, filters):
+        description = f"**{run.deleted}** messages were purged by {interaction.user.mention} in {interaction.channel.mention}."
+        if run.failed:
+            description += f"\n{run.failed} could not be deleted."
+        if error:
+            description += f"\n⚠ The purge stopped early: {str(error)[:500]}"
         embed = discord.Embed(
             title="🧹 Messages Purged",
-            description=f"**{len(purged)}** messages were purged by {interaction.user.mention} in {interaction.channel.mention}.",
+            description=description,
             color=discord.Color.orange(),
             timestamp=datetime.utcnow()
         )
+        if filters:
+            embed.add_field(name="Filters", value=", ".join(filters)[:1024], inline=False)
         embed.set_footer(text=f"User ID: {interaction.user.id}")
 
         if interaction.guild.icon:
             embed.set_thumbnail(url=interaction.guild.icon.url)
+        return embed
 
-        log_channel = await self.get_moderation_log_channel(interaction.guild)
-        if log_channel:
-            try:
-                await log_channel.send(embed=embed)
-                print("[DEBUG] Purge log sent to moderation log channel.")
-            except Exception as e:
-                print(f"[ERROR] Failed to send embed to log channel: {e}")
-        else:
+    async def log_purge(self, guild, embed, transcript):
+        log_channel = await self.get_moderation_log_channel(guild)
+        if not log_channel:
             print("[DEBUG] No moderation log channel set.")
-
-        await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        # The embed is also the command's response; the log gets its own copy.
+        embed = embed.copy()
+        size = await run_io(transcript.size)
+        if not size:
+            log_dispatcher.post(log_channel, embed)
+        elif size <= guild.filesize_limit:
+            embed.add_field(name="Transcript", value=f"{transcript.count} message(s), attached", inline=False)
+            log_dispatcher.post(log_channel, embed, transcript.path, os.path.basename(transcript.path))
+        else:
+            embed.add_field(
+                name="Transcript",
+                value=f"{transcript.count} message(s), {size // 1024 // 1024} MB — saved on the bot host as "
+                      f"`{transcript.path}`",
+                inline=False
+            )
+            log_dispatcher.post(log_channel, embed)
 
 async def setup(bot):
     await bot.add_cog(Purge(bot))
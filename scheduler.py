@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+
+from .storage import db
+
+# Handlers running at once. After downtime every overdue job is due at the same
+# moment; they are started in batches of this size instead of all together.
+MAX_CONCURRENT_JOBS = 10
+
+# A failed handler is retried after RETRY_BASE_DELAY * 2 ** attempt seconds, up
+# to MAX_JOB_RETRIES times, before the job is dropped.
+MAX_JOB_RETRIES = 5
+RETRY_BASE_DELAY = 30.0
+
+# ─── Timed Job Scheduler ───────────────────────────────────────────────────────
+#
+# One task for the whole bot. Jobs are identified by (kind, key), persisted in
+# the scheduled_jobs table and kept in a min-heap ordered by run_at, so the
+# loop sleeps until exactly the next deadline instead of polling.
+#
+# Cogs register an async handler per kind:
+#
+#     scheduler.register("giveaway_end", self.on_giveaway_end)
+#     await scheduler.schedule("giveaway_end", gid, end_time)
+#
+# Handlers receive (key, payload). Jobs that come due before their kind has a
+# handler (e.g. while a cog is still restoring state) wait until it registers.
+# A job's row is only deleted once its handler returns; a handler that raises
+# is retried with backoff, so handlers should let transient errors propagate.
+
+def _timestamp(when):
+    return when.timestamp() if isinstance(when, datetime) else float(when)
+
+
+class Scheduler:
+    def __init__(self):
+        self.heap = []
+        self.jobs = {}
+        self.handlers = {}
+        self.unhandled = {}
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.started = False
+        self.running = 0
+        self.attempts = {}
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+        for job_id in self.unhandled.pop(kind, []):
+            if job_id in self.jobs:
+                self._push(job_id)
+        self.wakeup.set()
+
+    def unregister(self, kind):
+        self.handlers.pop(kind, None)
+
+    async def start(self):
+        if self.started:
+            return
+        self.started = True
+        for kind, key, run_at, payload in await db.load_jobs():
+            self._add(kind, key, run_at, payload)
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        self.started = False
+
+    async def schedule(self, kind, key, when, payload=None):
+        key = str(key)
+        run_at = _timestamp(when)
+        await db.save_job(kind, key, run_at, payload)
+        self.attempts.pop((kind, key), None)
+        self._add(kind, key, run_at, payload)
+
+    async def cancel(self, kind, key):
+        key = str(key)
+        self.jobs.pop((kind, key), None)
+        self.attempts.pop((kind, key), None)
+        await db.delete_job(kind, key)
+
+    def has(self, kind, key):
+        return (kind, str(key)) in self.jobs
+
+    def payload(self, kind, key):
+        job = self.jobs.get((kind, str(key)))
+        return job[2] if job else None
+
+    def pending(self, kind=None):
+        return [job_id for job_id in self.jobs if kind is None or job_id[0] == kind]
+
+    def _add(self, kind, key, run_at, payload):
+        job_id = (kind, key)
+        self.jobs[job_id] = (run_at, next(self.counter), payload)
+        self._push(job_id)
+
+    def _push(self, job_id):
+        run_at, seq, _ = self.jobs[job_id]
+        heapq.heappush(self.heap, (run_at, seq, job_id))
+        if self.heap[0][2] == job_id:
+            self.wakeup.set()
+
+    def _pop_due(self, now, limit):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < limit:
+            run_at, seq, job_id = heapq.heappop(self.heap)
+            job = self.jobs.get(job_id)
+            # Rescheduled or cancelled jobs leave stale heap entries behind.
+            if job is None or job[1] != seq:
+                continue
+            if job_id[0] not in self.handlers:
+                self.unhandled.setdefault(job_id[0], []).append(job_id)
+                continue
+            # The job stays in self.jobs while its handler runs: a cancel or
+            # reschedule in the meantime replaces it and stops a retry.
+            due.append((job_id, run_at, job[1], job[2]))
+        return due
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            for job_id, run_at, seq, payload in self._pop_due(time.time(), MAX_CONCURRENT_JOBS - self.running):
+                self.running += 1
+                asyncio.get_running_loop().create_task(self._fire(job_id, run_at, seq, payload))
+
+            # At capacity, the next finished job sets wakeup.
+            if self.heap and self.running < MAX_CONCURRENT_JOBS:
+                delay = max(0.0, self.heap[0][0] - time.time())
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self.wakeup.wait()
+
+    async def _fire(self, job_id, run_at, seq, payload):
+        kind, key = job_id
+        try:
+            try:
+                await self.handlers[kind](key, payload)
+            except Exception as e:
+                await self._retry(job_id, seq, payload, e)
+                return
+            if self._current(job_id, seq):
+                del self.jobs[job_id]
+                self.attempts.pop(job_id, None)
+            await db.delete_job(kind, key, run_at)
+        except Exception as e:
+            print(f"[ERROR] Scheduled job {kind}:{key} could not be updated: {e}")
+        finally:
+            self.running -= 1
+            self.wakeup.set()
+
+    def _current(self, job_id, seq):
+        job = self.jobs.get(job_id)
+        return job is not None and job[1] == seq
+
+    async def _retry(self, job_id, seq, payload, error):
+        kind, key = job_id
+        if not self._current(job_id, seq):
+            print(f"[ERROR] Scheduled job {kind}:{key} failed: {error}")
+            return
+        attempt = self.attempts.get(job_id, 0)
+        if attempt >= MAX_JOB_RETRIES:
+            print(f"[ERROR] Scheduled job {kind}:{key} failed {attempt + 1} times, giving up: {error}")
+            del self.jobs[job_id]
+            self.attempts.pop(job_id, None)
+            await db.delete_job(kind, key)
+            return
+        self.attempts[job_id] = attempt + 1
+        delay = RETRY_BASE_DELAY * 2 ** attempt
+        print(f"[ERROR] Scheduled job {kind}:{key} failed ({error}), retrying in {delay:.0f}s")
+        run_at = time.time() + delay
+        self._add(kind, key, run_at, payload)
+        await db.save_job(kind, key, run_at, payload)
+
+# Shared by every cog.
+scheduler = Scheduler()
@@ -1,12 +1,9 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 from datetime import datetime
 
-DATA_DIR = "splitsteal_data"
-os.makedirs(DATA_DIR, exist_ok=True)
+from .storage import db
 
 class SplitStealView(discord.ui.View):
     def __init__(self, user1: discord.User, user2: discord.User, prize: str, host: discord.User, guild_id: int):
@@ -84,7 +81,6 @@ class SplitStealView(discord.ui.View):
         await self.save_game(user1_choice, user2_choice, result)
 
     async def save_game(self, user1_choice, user2_choice, result):
-        filepath = os.path.join(DATA_DIR, f"splitsteal_{self.guild_id}.json")
         game_data = {
             "user1_id": self.user1.id,
             "user2_id": self.user2.id,
@@ -97,14 +93,7 @@ class SplitStealView(discord.ui.View):
         }
 
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-            else:
-                data = []
-            data.append(game_data)
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=4)
+            await db.add_splitsteal_game(self.guild_id, game_data)
         except Exception as e:
             print(f"[ERROR] Failed to save splitsteal game: {e}")
 
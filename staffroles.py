@@ -1,13 +1,17 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
+from .guild_settings import settings
+from .log_dispatcher import log_dispatcher
+from .storage import db
 
 class StaffUpdate(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_unload(self):
+        await log_dispatcher.flush()
+
     @app_commands.command(
         name="staffupdate",
         description="Promote or demote a staff member"
@@ -37,22 +41,15 @@ class StaffUpdate(commands.Cog):
             )
 
         # 2) load role data
-        gid = str(interaction.guild.id)
-        path = f"staffroledata_{gid}.json"
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                data = json.load(f)
-        else:
-            data = {}
+        gid = interaction.guild.id
 
         # Default old name if not stored
-        old_name = data.get(str(member.id), "Member")
+        old_name = await db.get_staff_role(gid, member.id, "Member")
         old_idx = hierarchy.index(old_name)
         new_idx = hierarchy.index(new_role)
 
         # Get invoker's staff level
-        invoker_id = str(interaction.user.id)
-        invoker_name = data.get(invoker_id, "Member")
+        invoker_name = await db.get_staff_role(gid, interaction.user.id, "Member")
         invoker_idx = hierarchy.index(invoker_name)
 
         # Protection checks
@@ -81,9 +78,7 @@ class StaffUpdate(commands.Cog):
             )
 
         # Update data
-        data[str(member.id)] = new_role
-        with open(path, "w") as f:
-            json.dump(data, f, indent=4)
+        await db.set_staff_role(gid, member.id, new_role)
 
         # 3) build embed
         is_promo = new_idx > old_idx
@@ -133,16 +128,8 @@ class StaffUpdate(commands.Cog):
         if to_add:
             await member.add_roles(*to_add, reason="StaffUpdate assignment")
 
-        # 5) log in stafflog channel
-        cfg = f"server_data/{interaction.guild.id}_settings.json"
-        if os.path.exists(cfg):
-            with open(cfg, "r") as f:
-                settings = json.load(f)
-            ch_id = settings.get("stafflog_channel")
-            if ch_id:
-                ch = interaction.guild.get_channel(ch_id)
-                if ch:
-                    await ch.send(embed=embed)
+        # 5) log in stafflog channel (queued; sent in the background)
+        log_dispatcher.post(settings.get_channel(interaction.guild, "stafflog_channel"), embed)
 
         # 6) DM with plain role name instead of mention
         dm_embed = embed.copy()
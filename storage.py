@@ -0,0 +1,805 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from .io_pool import run_io
+
+DB_PATH = os.path.join("server_data", "bot.sqlite3")
+
+# member_events.kind
+EVENT_JOIN = 0
+EVENT_LEAVE = 1
+EVENT_FAKE = 2
+
+# Bucket sizes (seconds, UTC-aligned) kept in member_event_rollups.
+HOURLY = 3600
+DAILY = 86400
+
+# ─── Schema ────────────────────────────────────────────────────────────────────
+#
+# Each entry is applied once, in order, and tracked through PRAGMA user_version.
+# Never edit an entry that has shipped; append a new one instead.
+
+MIGRATIONS = [
+    """
+    CREATE TABLE invite_stats (
+        guild_id INTEGER NOT NULL,
+        user_id  INTEGER NOT NULL,
+        joined   INTEGER NOT NULL DEFAULT 0,
+        left     INTEGER NOT NULL DEFAULT 0,
+        fake     INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, user_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE members (
+        guild_id   INTEGER NOT NULL,
+        member_id  INTEGER NOT NULL,
+        inviter_id INTEGER,
+        fake       INTEGER NOT NULL DEFAULT 0,
+        role       TEXT,
+        PRIMARY KEY (guild_id, member_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_members_inviter ON members (guild_id, inviter_id);
+
+    CREATE TABLE claims (
+        guild_id INTEGER NOT NULL,
+        user_id  INTEGER NOT NULL,
+        count    INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, user_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE staff_roles (
+        guild_id INTEGER NOT NULL,
+        user_id  INTEGER NOT NULL,
+        role     TEXT NOT NULL,
+        PRIMARY KEY (guild_id, user_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE splitsteal_games (
+        id           INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id     INTEGER NOT NULL,
+        user1_id     INTEGER NOT NULL,
+        user2_id     INTEGER NOT NULL,
+        host_id      INTEGER NOT NULL,
+        prize        TEXT NOT NULL,
+        user1_choice TEXT,
+        user2_choice TEXT,
+        result       TEXT,
+        timestamp    TEXT NOT NULL
+    );
+    CREATE INDEX idx_splitsteal_guild ON splitsteal_games (guild_id, timestamp);
+
+    CREATE TABLE giveaways (
+        giveaway_id INTEGER PRIMARY KEY,
+        guild_id    INTEGER NOT NULL,
+        channel_id  INTEGER NOT NULL,
+        prize       TEXT NOT NULL,
+        winners     INTEGER NOT NULL,
+        end_time    TEXT NOT NULL,
+        host_id     INTEGER NOT NULL
+    );
+    CREATE INDEX idx_giveaways_guild ON giveaways (guild_id);
+    CREATE INDEX idx_giveaways_end ON giveaways (end_time);
+
+    CREATE TABLE giveaway_entries (
+        giveaway_id INTEGER NOT NULL,
+        user_id     INTEGER NOT NULL,
+        PRIMARY KEY (giveaway_id, user_id)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE scheduled_jobs (
+        kind    TEXT NOT NULL,
+        key     TEXT NOT NULL,
+        run_at  REAL NOT NULL,
+        payload TEXT,
+        PRIMARY KEY (kind, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_scheduled_jobs_run_at ON scheduled_jobs (run_at);
+    """,
+    """
+    ALTER TABLE giveaways ADD COLUMN view_version INTEGER NOT NULL DEFAULT 0;
+    """,
+    """
+    ALTER TABLE giveaways ADD COLUMN requirements TEXT;
+    ALTER TABLE giveaway_entries ADD COLUMN tickets INTEGER NOT NULL DEFAULT 1;
+    """,
+    """
+    CREATE TABLE invite_snapshots (
+        guild_id   INTEGER NOT NULL,
+        code       TEXT NOT NULL,
+        uses       INTEGER NOT NULL,
+        inviter_id INTEGER,
+        max_uses   INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, code)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE member_events (
+        guild_id   INTEGER NOT NULL,
+        ts         INTEGER NOT NULL,
+        kind       INTEGER NOT NULL,
+        member_id  INTEGER NOT NULL,
+        inviter_id INTEGER
+    );
+
+    CREATE TABLE member_event_rollups (
+        guild_id   INTEGER NOT NULL,
+        period     INTEGER NOT NULL,
+        inviter_id INTEGER NOT NULL,
+        bucket     INTEGER NOT NULL,
+        joined     INTEGER NOT NULL DEFAULT 0,
+        left       INTEGER NOT NULL DEFAULT 0,
+        fake       INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, period, inviter_id, bucket)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE mod_cases (
+        guild_id     INTEGER NOT NULL,
+        case_id      INTEGER NOT NULL,
+        action       TEXT NOT NULL,
+        user_id      INTEGER NOT NULL,
+        moderator_id INTEGER NOT NULL,
+        reason       TEXT,
+        proof_url    TEXT,
+        duration     INTEGER,
+        created_at   INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, case_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_mod_cases_user ON mod_cases (guild_id, user_id, case_id);
+    CREATE INDEX idx_mod_cases_moderator ON mod_cases (guild_id, moderator_id, case_id);
+    CREATE INDEX idx_mod_cases_time ON mod_cases (guild_id, created_at);
+    """,
+    """
+    -- Was the ban index, since removed. Kept so later migrations keep their numbers.
+    """,
+    """
+    ALTER TABLE mod_cases ADD COLUMN proof_sha256 TEXT;
+
+    CREATE TABLE proof_files (
+        sha256       TEXT PRIMARY KEY,
+        size         INTEGER NOT NULL,
+        filename     TEXT,
+        content_type TEXT,
+        stored_at    INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TABLE lockdown_snapshots (
+        guild_id      INTEGER NOT NULL,
+        channel_id    INTEGER NOT NULL,
+        allow         INTEGER NOT NULL,
+        deny          INTEGER NOT NULL,
+        had_overwrite INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, channel_id)
+    ) WITHOUT ROWID;
+    """,
+    """
+    DROP TABLE IF EXISTS bans;
+    """,
+]
+
+# ─── Storage ───────────────────────────────────────────────────────────────────
+
+class Storage:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._local.conn = conn
+
+        with self._init_lock:
+            if not self._initialized:
+                fresh = self._migrate(conn)
+                self._initialized = True
+                if fresh:
+                    import_legacy_json(self)
+        return conn
+
+    def _migrate(self, conn):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for index, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in script.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {index}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version == 0
+
+    def execute(self, sql, params=()):
+        return self._connect().execute(sql, params)
+
+    def transaction(self):
+        return _Transaction(self._connect())
+
+    # ─── Invite stats ──────────────────────────────────────────────────────────
+
+    def get_invite_stats(self, guild_id, user_id):
+        row = self.execute(
+            "SELECT joined, left, fake FROM invite_stats WHERE guild_id = ? AND user_id = ?",
+            (guild_id, user_id)
+        ).fetchone()
+        return dict(row) if row else {"joined": 0, "left": 0, "fake": 0}
+
+    def all_invite_stats(self, guild_id):
+        rows = self.execute(
+            "SELECT user_id, joined, left, fake FROM invite_stats WHERE guild_id = ?",
+            (guild_id,)
+        )
+        return {row["user_id"]: {"joined": row["joined"], "left": row["left"], "fake": row["fake"]} for row in rows}
+
+    def add_invite_stats(self, guild_id, user_id, joined=0, left=0, fake=0):
+        self.execute(
+            "INSERT INTO invite_stats (guild_id, user_id, joined, left, fake) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET "
+            "joined = joined + excluded.joined, left = left + excluded.left, fake = fake + excluded.fake",
+            (guild_id, user_id, joined, left, fake)
+        )
+
+    def reset_invite_stats(self, guild_id, user_id=None):
+        if user_id is None:
+            self.execute("UPDATE invite_stats SET joined = 0, left = 0, fake = 0 WHERE guild_id = ?", (guild_id,))
+        else:
+            self.execute(
+                "UPDATE invite_stats SET joined = 0, left = 0, fake = 0 WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            )
+
+    def reset_invites(self, guild_id, user_id=None):
+        with self.transaction():
+            self.reset_invite_stats(guild_id, user_id)
+            self.reset_claims(guild_id, user_id)
+
+    # Writes only what changed since the last save: new or updated codes are
+    # upserted, codes that are gone are deleted.
+    def save_invite_snapshot(self, guild_id, changed, removed=()):
+        with self.transaction():
+            self._connect().executemany(
+                "INSERT INTO invite_snapshots (guild_id, code, uses, inviter_id, max_uses) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, code) DO UPDATE SET "
+                "uses = excluded.uses, inviter_id = excluded.inviter_id, max_uses = excluded.max_uses",
+                [(guild_id, code, uses, inviter_id, max_uses) for code, (uses, inviter_id, max_uses) in changed.items()]
+            )
+            self._connect().executemany(
+                "DELETE FROM invite_snapshots WHERE guild_id = ? AND code = ?",
+                [(guild_id, code) for code in removed]
+            )
+
+    def load_invite_snapshot(self, guild_id):
+        return {
+            row["code"]: (row["uses"], row["inviter_id"], row["max_uses"])
+            for row in self.execute(
+                "SELECT code, uses, inviter_id, max_uses FROM invite_snapshots WHERE guild_id = ?", (guild_id,)
+            )
+        }
+
+    def load_invite_snapshots(self):
+        snapshots = {}
+        for row in self.execute("SELECT guild_id, code, uses, inviter_id, max_uses FROM invite_snapshots"):
+            snapshots.setdefault(row["guild_id"], {})[row["code"]] = (row["uses"], row["inviter_id"], row["max_uses"])
+        return snapshots
+
+    # ─── Members ───────────────────────────────────────────────────────────────
+
+    def get_member(self, guild_id, member_id):
+        row = self.execute(
+            "SELECT inviter_id, fake, role FROM members WHERE guild_id = ? AND member_id = ?",
+            (guild_id, member_id)
+        ).fetchone()
+        if not row:
+            return None
+        return {"inviter_id": row["inviter_id"], "fake": bool(row["fake"]), "role": row["role"]}
+
+    def add_member(self, guild_id, member_id, inviter_id, fake):
+        cur = self.execute(
+            "INSERT OR IGNORE INTO members (guild_id, member_id, inviter_id, fake) VALUES (?, ?, ?, ?)",
+            (guild_id, member_id, inviter_id, int(fake))
+        )
+        return cur.rowcount > 0
+
+    def set_member_role(self, guild_id, member_id, role):
+        self.execute(
+            "UPDATE members SET role = ? WHERE guild_id = ? AND member_id = ?",
+            (role, guild_id, member_id)
+        )
+
+    def pop_member(self, guild_id, member_id):
+        with self.transaction():
+            info = self.get_member(guild_id, member_id)
+            if info:
+                self.execute("DELETE FROM members WHERE guild_id = ? AND member_id = ?", (guild_id, member_id))
+        return info
+
+    def record_join(self, guild_id, member_id, inviter_id, fake):
+        with self.transaction():
+            if not self.add_member(guild_id, member_id, inviter_id, fake):
+                return False
+            if inviter_id and fake:
+                self.add_invite_stats(guild_id, inviter_id, fake=1)
+            elif inviter_id:
+                self.add_invite_stats(guild_id, inviter_id, joined=1)
+            self.add_member_event(guild_id, EVENT_FAKE if fake else EVENT_JOIN, member_id, inviter_id)
+        return True
+
+    def record_leave(self, guild_id, member_id):
+        with self.transaction():
+            info = self.pop_member(guild_id, member_id)
+            inviter_id = info["inviter_id"] if info else None
+            if inviter_id:
+                self.add_invite_stats(guild_id, inviter_id, left=1)
+            self.add_member_event(guild_id, EVENT_LEAVE, member_id, inviter_id)
+        return info
+
+    # ─── Member events ─────────────────────────────────────────────────────────
+    #
+    # member_events is an append-only log with no secondary index, so inserts
+    # stay cheap. Every event also bumps its hourly and daily bucket, once for
+    # the guild as a whole (inviter_id 0) and once for its inviter, and all
+    # queries are answered from those rollups.
+
+    def add_member_event(self, guild_id, kind, member_id, inviter_id=None, ts=None):
+        ts = int(time.time() if ts is None else ts)
+        self.execute(
+            "INSERT INTO member_events (guild_id, ts, kind, member_id, inviter_id) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, ts, kind, member_id, inviter_id)
+        )
+        counts = (int(kind == EVENT_JOIN), int(kind == EVENT_LEAVE), int(kind == EVENT_FAKE))
+        owners = (0, inviter_id) if inviter_id else (0,)
+        self._connect().executemany(
+            "INSERT INTO member_event_rollups (guild_id, period, inviter_id, bucket, joined, left, fake) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (guild_id, period, inviter_id, bucket) DO UPDATE SET "
+            "joined = joined + excluded.joined, left = left + excluded.left, fake = fake + excluded.fake",
+            [
+                (guild_id, period, owner, ts - ts % period, *counts)
+                for period in (HOURLY, DAILY) for owner in owners
+            ]
+        )
+
+    def member_event_rollups(self, guild_id, period, since, inviter_id=0):
+        rows = self.execute(
+            "SELECT bucket, joined, left, fake FROM member_event_rollups "
+            "WHERE guild_id = ? AND period = ? AND inviter_id = ? AND bucket >= ? ORDER BY bucket",
+            (guild_id, period, inviter_id, int(since) - int(since) % period)
+        )
+        return [(row["bucket"], row["joined"], row["left"], row["fake"]) for row in rows]
+
+    def apply_counter_events(self, events):
+        # One transaction for a whole CounterService batch, applied in order.
+        handlers = {
+            "join": self.record_join,
+            "leave": self.record_leave,
+            "claims": self.add_claims,
+            "reset": self.reset_invites,
+            "stats": self.all_invite_stats,
+        }
+        with self.transaction():
+            return [handlers[kind](*args) for kind, args in events]
+
+    # ─── Claims ────────────────────────────────────────────────────────────────
+
+    def get_claims(self, guild_id, user_id):
+        row = self.execute(
+            "SELECT count FROM claims WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ).fetchone()
+        return row["count"] if row else 0
+
+    def add_claims(self, guild_id, user_id, delta):
+        with self.transaction():
+            self.execute(
+                "INSERT INTO claims (guild_id, user_id, count) VALUES (?, ?, MAX(0, ?)) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET count = MAX(0, count + ?)",
+                (guild_id, user_id, delta, delta)
+            )
+            return self.get_claims(guild_id, user_id)
+
+    def reset_claims(self, guild_id, user_id=None):
+        if user_id is None:
+            self.execute("DELETE FROM claims WHERE guild_id = ?", (guild_id,))
+        else:
+            self.execute("DELETE FROM claims WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+
+    # ─── Staff roles ───────────────────────────────────────────────────────────
+
+    def get_staff_role(self, guild_id, user_id, default=None):
+        row = self.execute(
+            "SELECT role FROM staff_roles WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ).fetchone()
+        return row["role"] if row else default
+
+    def set_staff_role(self, guild_id, user_id, role):
+        self.execute(
+            "INSERT INTO staff_roles (guild_id, user_id, role) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, user_id) DO UPDATE SET role = excluded.role",
+            (guild_id, user_id, role)
+        )
+
+    # ─── Split or Steal ────────────────────────────────────────────────────────
+
+    def add_splitsteal_game(self, guild_id, game):
+        self.execute(
+            "INSERT INTO splitsteal_games "
+            "(guild_id, user1_id, user2_id, host_id, prize, user1_choice, user2_choice, result, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                guild_id, game["user1_id"], game["user2_id"], game["host_id"], game["prize"],
+                game.get("user1_choice"), game.get("user2_choice"), game.get("result"), game["timestamp"]
+            )
+        )
+
+    # ─── Giveaways ─────────────────────────────────────────────────────────────
+
+    def save_giveaway(self, guild_id, giveaway_id, g):
+        self.execute(
+            "INSERT INTO giveaways "
+            "(giveaway_id, guild_id, channel_id, prize, winners, end_time, host_id, view_version, requirements) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (giveaway_id) DO UPDATE SET channel_id = excluded.channel_id, prize = excluded.prize, "
+            "winners = excluded.winners, end_time = excluded.end_time, host_id = excluded.host_id, "
+            "view_version = excluded.view_version, requirements = excluded.requirements",
+            (
+                giveaway_id, guild_id, g["channel"], g["prize"], g["winners"], g["end_time"], g["host"],
+                g.get("view_version", 0), json.dumps(g["requirements"]) if g.get("requirements") else None
+            )
+        )
+
+    def delete_giveaway(self, giveaway_id):
+        with self.transaction():
+            self.execute("DELETE FROM giveaway_entries WHERE giveaway_id = ?", (giveaway_id,))
+            self.execute("DELETE FROM giveaways WHERE giveaway_id = ?", (giveaway_id,))
+
+    def load_giveaways(self):
+        rows = self.execute(
+            "SELECT giveaway_id, guild_id, channel_id, prize, winners, end_time, host_id, view_version, requirements "
+            "FROM giveaways"
+        ).fetchall()
+        giveaways = []
+        for row in rows:
+            g = dict(row)
+            g["requirements"] = json.loads(g["requirements"]) if g["requirements"] else {}
+            giveaways.append(g)
+        return giveaways
+
+    def add_giveaway_entry(self, giveaway_id, user_id, tickets=1):
+        cur = self.execute(
+            "INSERT OR IGNORE INTO giveaway_entries (giveaway_id, user_id, tickets) VALUES (?, ?, ?)",
+            (giveaway_id, user_id, tickets)
+        )
+        return cur.rowcount > 0
+
+    def giveaway_bonus_tickets(self, giveaway_id):
+        rows = self.execute(
+            "SELECT user_id, tickets FROM giveaway_entries WHERE giveaway_id = ? AND tickets > 1", (giveaway_id,)
+        )
+        return {row["user_id"]: row["tickets"] - 1 for row in rows}
+
+    def giveaway_entries(self, giveaway_id):
+        # Primary-key order, so the result is already sorted for EntrySet.
+        rows = self.execute(
+            "SELECT user_id FROM giveaway_entries WHERE giveaway_id = ? ORDER BY user_id", (giveaway_id,)
+        )
+        return array("q", (row[0] for row in rows))
+
+    # ─── Moderation cases ──────────────────────────────────────────────────────
+    #
+    # Case numbers are per guild and increase with time. Listings page by case
+    # number (keyset pagination), so every page is one index range scan no
+    # matter how deep it is.
+
+    def add_mod_case(self, guild_id, action, user_id, moderator_id, reason=None, proof_url=None, duration=None):
+        with self.transaction():
+            row = self.execute("SELECT MAX(case_id) FROM mod_cases WHERE guild_id = ?", (guild_id,)).fetchone()
+            case_id = (row[0] or 0) + 1
+            self.execute(
+                "INSERT INTO mod_cases "
+                "(guild_id, case_id, action, user_id, moderator_id, reason, proof_url, duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, case_id, action, user_id, moderator_id, reason, proof_url, duration, int(time.time()))
+            )
+        return case_id
+
+    def add_mod_cases(self, guild_id, action, user_ids, moderator_id, reason=None, duration=None):
+        # One case per user, numbered consecutively; returns the case numbers.
+        with self.transaction():
+            row = self.execute("SELECT MAX(case_id) FROM mod_cases WHERE guild_id = ?", (guild_id,)).fetchone()
+            first = (row[0] or 0) + 1
+            now = int(time.time())
+            self._connect().executemany(
+                "INSERT INTO mod_cases "
+                "(guild_id, case_id, action, user_id, moderator_id, reason, proof_url, duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                [
+                    (guild_id, first + i, action, user_id, moderator_id, reason, duration, now)
+                    for i, user_id in enumerate(user_ids)
+                ]
+            )
+        return list(range(first, first + len(user_ids)))
+
+    def get_mod_case(self, guild_id, case_id):
+        row = self.execute(
+            "SELECT * FROM mod_cases WHERE guild_id = ? AND case_id = ?", (guild_id, case_id)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def set_case_proof(self, guild_id, case_id, sha256):
+        self.execute(
+            "UPDATE mod_cases SET proof_sha256 = ? WHERE guild_id = ? AND case_id = ?",
+            (sha256, guild_id, case_id)
+        )
+
+    def mod_cases(self, guild_id, user_id=None, moderator_id=None, action=None, since=None, before_case=None, limit=10):
+        where = ["guild_id = ?"]
+        params = [guild_id]
+        for column, value in (("user_id", user_id), ("moderator_id", moderator_id), ("action", action)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(int(since))
+        if before_case is not None:
+            where.append("case_id < ?")
+            params.append(before_case)
+        # Without ANALYZE statistics SQLite prefers walking the primary key in
+        # case order, which degrades to a full scan for a rarely-seen user.
+        index = ""
+        if user_id is not None:
+            index = "INDEXED BY idx_mod_cases_user"
+        elif moderator_id is not None:
+            index = "INDEXED BY idx_mod_cases_moderator"
+        rows = self.execute(
+            f"SELECT * FROM mod_cases {index} WHERE {' AND '.join(where)} ORDER BY case_id DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [dict(row) for row in rows]
+
+    # ─── Proof files ───────────────────────────────────────────────────────────
+
+    def add_proof_file(self, sha256, size, filename=None, content_type=None):
+        self.execute(
+            "INSERT OR IGNORE INTO proof_files (sha256, size, filename, content_type, stored_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sha256, size, filename, content_type, int(time.time()))
+        )
+
+    def get_proof_file(self, sha256):
+        row = self.execute("SELECT * FROM proof_files WHERE sha256 = ?", (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    # ─── Lockdown snapshots ────────────────────────────────────────────────────
+    #
+    # The @everyone overwrite of each channel as it was before /lockdown start.
+    # INSERT OR IGNORE: re-running start after a partial failure must never
+    # replace a channel's original state with its locked one.
+
+    def save_lockdown_snapshots(self, guild_id, snapshots):
+        with self.transaction():
+            self._connect().executemany(
+                "INSERT OR IGNORE INTO lockdown_snapshots (guild_id, channel_id, allow, deny, had_overwrite) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(guild_id, channel_id, allow, deny, int(had)) for channel_id, allow, deny, had in snapshots]
+            )
+
+    def load_lockdown_snapshots(self, guild_id):
+        rows = self.execute(
+            "SELECT channel_id, allow, deny, had_overwrite FROM lockdown_snapshots WHERE guild_id = ?", (guild_id,)
+        )
+        return {row["channel_id"]: (row["allow"], row["deny"], bool(row["had_overwrite"])) for row in rows}
+
+    def delete_lockdown_snapshots(self, guild_id, channel_ids):
+        with self.transaction():
+            self._connect().executemany(
+                "DELETE FROM lockdown_snapshots WHERE guild_id = ? AND channel_id = ?",
+                [(guild_id, channel_id) for channel_id in channel_ids]
+            )
+
+    # ─── Scheduled jobs ────────────────────────────────────────────────────────
+
+    def save_job(self, kind, key, run_at, payload):
+        self.execute(
+            "INSERT INTO scheduled_jobs (kind, key, run_at, payload) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET run_at = excluded.run_at, payload = excluded.payload",
+            (kind, key, run_at, json.dumps(payload) if payload is not None else None)
+        )
+
+    def delete_job(self, kind, key, run_at=None):
+        if run_at is None:
+            self.execute("DELETE FROM scheduled_jobs WHERE kind = ? AND key = ?", (kind, key))
+        else:
+            # Only remove the row if it was not rescheduled in the meantime.
+            self.execute(
+                "DELETE FROM scheduled_jobs WHERE kind = ? AND key = ? AND run_at = ?",
+                (kind, key, run_at)
+            )
+
+    def load_jobs(self):
+        rows = self.execute("SELECT kind, key, run_at, payload FROM scheduled_jobs ORDER BY run_at")
+        return [
+            (row["kind"], row["key"], row["run_at"], json.loads(row["payload"]) if row["payload"] else None)
+            for row in rows
+        ]
+
+
+class AsyncStorage:
+    # Awaitable mirror of Storage: `await db.get_claims(...)` runs
+    # storage.get_claims(...) on the I/O pool. Anything that must be atomic
+    # belongs in a single Storage method, since consecutive calls may land on
+    # different worker threads.
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        func = getattr(self.store, name)
+        if not callable(func) or name.startswith("_") or name == "transaction":
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await run_io(func, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+        self.outer = False
+
+    def __enter__(self):
+        self.outer = not self.conn.in_transaction
+        if self.outer:
+            self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+# ─── Legacy JSON Import ────────────────────────────────────────────────────────
+#
+# Runs automatically the first time the database is created. Each imported file
+# is renamed to *.imported so the import never runs twice for the same data.
+
+def _mark_imported(path):
+    os.replace(path, path + ".imported")
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[ERROR] Skipping {path} during import: {e}")
+        return None
+
+def import_legacy_json(store, root="."):
+    imported = 0
+
+    for path in glob.glob(os.path.join(root, "server_data", "*_invites.json")):
+        guild_id = int(os.path.basename(path).split("_")[0])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for user_id, stats in data.items():
+                store.add_invite_stats(
+                    guild_id, int(user_id),
+                    stats.get("joined", 0), stats.get("left", 0), stats.get("fake", 0)
+                )
+        _mark_imported(path)
+        imported += 1
+
+    for path in glob.glob(os.path.join(root, "server_data", "*_members.json")):
+        guild_id = int(os.path.basename(path).split("_")[0])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for member_id, info in data.items():
+                store.add_member(guild_id, int(member_id), info.get("inviter_id"), info.get("fake", False))
+                if info.get("role"):
+                    store.set_member_role(guild_id, int(member_id), info["role"])
+        _mark_imported(path)
+        imported += 1
+
+    for path in glob.glob(os.path.join(root, "invites_*.json")):
+        guild_id = int(os.path.basename(path)[len("invites_"):-len(".json")])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for user_id, count in data.items():
+                store.add_claims(guild_id, int(user_id), int(count))
+        _mark_imported(path)
+        imported += 1
+
+    for path in glob.glob(os.path.join(root, "staffroledata_*.json")):
+        guild_id = int(os.path.basename(path)[len("staffroledata_"):-len(".json")])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for user_id, role in data.items():
+                store.set_staff_role(guild_id, int(user_id), role)
+        _mark_imported(path)
+        imported += 1
+
+    for path in glob.glob(os.path.join(root, "splitsteal_data", "splitsteal_*.json")):
+        guild_id = int(os.path.basename(path)[len("splitsteal_"):-len(".json")])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for game in data:
+                store.add_splitsteal_game(guild_id, game)
+        _mark_imported(path)
+        imported += 1
+
+    if imported:
+        print(f"[INFO] Imported {imported} legacy JSON file(s) into {store.path}")
+    return imported
+
+# Every legacy giveaway file was written with the giveaways of all guilds, and
+# another guild's file may still hold a stale copy of one that has since ended.
+# Like the old loader, a record is only taken from the file of its own guild:
+# the record's "guild", or else its channel's guild, which needs the gateway.
+# The giveaway cog runs this once it is ready, with a channel id -> guild id
+# map. Records whose guild can't be determined are skipped. Returns the
+# imported giveaway ids.
+def import_legacy_giveaways(store, channel_guilds, root="."):
+    imported = set()
+    for path in glob.glob(os.path.join(root, "giveaway", "*.json")):
+        file_guild_id = int(os.path.basename(path)[:-len(".json")])
+        data = _load_json(path)
+        if data is None:
+            continue
+        with store.transaction():
+            for gid, g in data.items():
+                guild_id = g.get("guild") or channel_guilds.get(g.get("channel"))
+                if guild_id is None:
+                    print(f"[INFO] Skipping legacy giveaway {gid}: its guild can't be determined")
+                    continue
+                if guild_id != file_guild_id:
+                    continue
+                store.save_giveaway(guild_id, int(gid), g)
+                for user_id in g.get("entries", []):
+                    store.add_giveaway_entry(int(gid), int(user_id))
+                imported.add(int(gid))
+        _mark_imported(path)
+
+    if imported:
+        print(f"[INFO] Imported {len(imported)} legacy giveaway(s) into {store.path}")
+    return imported
+
+# Shared by every cog; connections are opened lazily on first use. Coroutines
+# should go through `db` so queries run off the event loop.
+storage = Storage()
+db = AsyncStorage(storage)
+
+if __name__ == "__main__":
+    import_legacy_json(storage)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+# ─── User Resolution Cache ─────────────────────────────────────────────────────
+#
+# Resolves user IDs to Member/User objects: guild member cache first, then the
+# client's user cache, then a TTL/LRU cache of earlier REST results, and only
+# then fetch_user. Unknown users are cached as None as well. Concurrent lookups
+# of the same ID share one request, and REST fetches are capped so a large
+# draw cannot burst the API.
+
+_MISSING = object()
+
+
+class UserCache:
+    def __init__(self, max_size=5000, ttl=600, concurrency=8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.semaphore = None
+
+    def get(self, user_id, default=None):
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return default
+        expires, user = entry
+        if expires < time.monotonic():
+            del self.entries[user_id]
+            return default
+        self.entries.move_to_end(user_id)
+        return user
+
+    def put(self, user_id, user):
+        self.entries[user_id] = (time.monotonic() + self.ttl, user)
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def resolve(self, bot, user_id, guild=None):
+        user = (guild and guild.get_member(user_id)) or bot.get_user(user_id)
+        if user is not None:
+            return user
+        user = self.get(user_id, _MISSING)
+        if user is not _MISSING:
+            return user
+
+        task = self.inflight.get(user_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(bot, user_id))
+            self.inflight[user_id] = task
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, bot, user_ids, guild=None):
+        users = await asyncio.gather(*(self.resolve(bot, uid, guild) for uid in user_ids))
+        return dict(zip(user_ids, users))
+
+    async def _fetch(self, bot, user_id):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self.semaphore:
+                try:
+                    user = await bot.fetch_user(user_id)
+                except discord.NotFound:
+                    user = None
+                except discord.HTTPException as e:
+                    print(f"[ERROR] Failed to fetch user {user_id}: {e}")
+                    return None
+            self.put(user_id, user)
+            return user
+        finally:
+            self.inflight.pop(user_id, None)
+
+# Shared by every cog.
+user_cache = UserCache()